@@ -6,6 +6,15 @@ DATA_DIR = os.path.join(REPO_ROOT, "data")
 RAW_DATA_DIR = os.path.join(REPO_ROOT, "raw_data")
 SCRIPTS_DIR = os.path.join(REPO_ROOT, "scripts")
 PLOTS_DIR = os.path.join(REPO_ROOT, "plots")
+CACHE_DIR = os.path.join(REPO_ROOT, "cache")
+BATCH_DIR = os.path.join(REPO_ROOT, "batches")
+TABLE_CACHE_DIR = os.path.join(REPO_ROOT, "table_cache")
 
 
 
+
+# Batch rendering (HEADLESS=1): matplotlib uses the non-interactive Agg backend and plt.show() is skipped.
+HEADLESS = os.environ.get("HEADLESS", "0") != "0"
+if HEADLESS:
+    import matplotlib
+    matplotlib.use("Agg")  # Also switches pyplot over if a script imported it first
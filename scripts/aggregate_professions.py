@@ -0,0 +1,131 @@
+"""
+Generate every profession ranking table from the raw extraction output in a single pass.
+
+The protagonists' professions are read once (via the Parquet store built from
+book_character_professions.csv) and counted per (genre, profession) in one group-by:
+
+- Raw_Count: number of times a profession is listed for a protagonist
+- Normalized_Count: each book has a total weight of 1, split equally between its protagonists
+  and then between each protagonist's professions
+
+From that single table the script writes one ranking per genre, the combined ranking over the
+realistic genres and the all-genre ranking with a column per genre. Raw professions are mapped to
+ranking categories with PROFESSION_MAP_FILE when it exists. Hand-curated columns of the existing
+combined workbooks (labels, real-world counts, salary, prestige) are carried over by profession.
+
+Tables are written to OUTPUT_DIR rather than over the hand-maintained workbooks in data/.
+"""
+import os
+import time
+import pandas as pd
+import config
+from table_cache import read_excel_cached
+from profession_store import load_store
+
+OUTPUT_DIR = os.path.join(config.DATA_DIR, "generated")
+PROFESSION_MAP_FILE = os.path.join(config.DATA_DIR, "profession_mapping.csv")  # Columns: Raw, Profession
+
+# Canonical genre name -> ranking file name
+GENRE_FILES = {
+    "Contemporary fiction": "contemporary_fiction.xlsx",
+    "Fantasy": "fantasy.xlsx",
+    "Fantasy romance": "fantasy_romance.xlsx",
+    "Historical fiction": "historical_fiction.xlsx",
+    "Horror": "horror.xlsx",
+    "Literary fiction": "literary_fiction.xlsx",
+    "Mystery": "mystery.xlsx",
+    "Romance": "romance.xlsx",
+    "Science fiction": "science_fiction.xlsx",
+    "Thriller": "thriller.xlsx",
+}
+
+REALISTIC_GENRES = ["Contemporary fiction", "Horror", "Literary fiction", "Mystery", "Thriller", "Romance"]
+
+# Misspellings of genre names found in the extraction output
+GENRE_ALIASES = {"Contermporary fiction": "Contemporary fiction"}
+
+UNKNOWN = ["", "none", "unknown", "nan"]
+
+def normalize_genres(genres):
+    genres = genres.astype(str).str.strip().str.capitalize()
+    return genres.replace(GENRE_ALIASES)
+
+def normalize_professions(professions):
+    """Tidy raw profession strings and map them to ranking categories if a mapping file exists."""
+    professions = professions.astype(str).str.strip()
+    professions = professions.where(~professions.str.lower().isin(UNKNOWN), "Unknown")
+
+    if os.path.isfile(PROFESSION_MAP_FILE):
+        mapping = pd.read_csv(PROFESSION_MAP_FILE, usecols=["Raw", "Profession"]).dropna()
+        mapped = professions.map(dict(zip(mapping["Raw"], mapping["Profession"])))
+        return mapped.fillna(professions.str.capitalize())
+    return professions.str.capitalize()
+
+def count_professions():
+    """Raw and normalized counts per (genre, profession) for protagonists, in one group-by."""
+    df = load_store(columns=["row_index", "genre", "role", "character_index", "profession"])
+    df = df[df["role"] == "protagonist"]
+
+    characters = df.groupby("row_index", observed=True)["character_index"].transform("nunique")
+    professions = df.groupby(["row_index", "character_index"], observed=True)["profession"].transform("size")
+
+    counts = pd.DataFrame({
+        "Genre": normalize_genres(df["genre"]).to_numpy(),
+        "Profession": normalize_professions(df["profession"]).to_numpy(),
+        "Weight": 1.0 / (characters.to_numpy() * professions.to_numpy()),
+    })
+    counts = counts.groupby(["Genre", "Profession"], as_index=False).agg(
+        Raw_Count=("Weight", "size"),
+        Normalized_Count=("Weight", "sum"),
+    )
+    print(f"Counted {len(df)} protagonist professions from {df['row_index'].nunique()} books")
+    return counts
+
+def rank(df):
+    return df.sort_values("Normalized_Count", ascending=False).reset_index(drop=True)
+
+def carry_over_columns(df, workbook, columns):
+    """Join hand-curated columns of an existing workbook onto a generated table, by profession."""
+    path = os.path.join(config.DATA_DIR, workbook)
+    if not os.path.isfile(path):
+        return df
+    existing = read_excel_cached(path)
+    columns = [column for column in columns if column in existing.columns]
+    existing = existing[["Profession"] + columns].drop_duplicates(subset="Profession")
+    return df.merge(existing, on="Profession", how="left")
+
+def write_rankings(counts, output_dir=OUTPUT_DIR):
+    os.makedirs(os.path.join(output_dir, "genres"), exist_ok=True)
+
+    # One ranking per genre, in the headerless three-column layout of data/genres/*.xlsx
+    for genre, file_name in GENRE_FILES.items():
+        genre_counts = rank(counts.loc[counts["Genre"] == genre, ["Profession", "Raw_Count", "Normalized_Count"]])
+        genre_counts.to_excel(os.path.join(output_dir, "genres", file_name), header=False, index=False)
+
+    other_genres = sorted(set(counts["Genre"]) - set(GENRE_FILES))
+    if other_genres:
+        print(f"Genres without a ranking file (left out of the combined tables): {', '.join(other_genres)}")
+
+    # Combined ranking over the realistic genres
+    realistic = counts[counts["Genre"].isin(REALISTIC_GENRES)]
+    realistic = rank(realistic.groupby("Profession", as_index=False)[["Raw_Count", "Normalized_Count"]].sum())
+    realistic = carry_over_columns(realistic, "profession_ranking_realistic_genres.xlsx",
+                                   ["Quantity", "Source", "Salary", "Salary_Year", "Prestige"])
+    realistic.to_excel(os.path.join(output_dir, "profession_ranking_realistic_genres.xlsx"), index=False)
+
+    # All-genre ranking, with each genre's normalized count as a column
+    all_genres = counts[counts["Genre"].isin(GENRE_FILES)]
+    totals = all_genres.groupby("Profession", as_index=False)[["Raw_Count", "Normalized_Count"]].sum()
+    per_genre = all_genres.pivot_table(index="Profession", columns="Genre", values="Normalized_Count", aggfunc="sum")
+    per_genre = per_genre.reindex(columns=list(GENRE_FILES)).reset_index()
+    all_table = rank(totals).pipe(carry_over_columns, "profession_ranking_all_genres.xlsx", ["Label"])
+    all_table = all_table.merge(per_genre, on="Profession", how="left")
+    all_table.to_excel(os.path.join(output_dir, "profession_ranking_all_genres.xlsx"), index=False)
+
+    print(f"Wrote {len(GENRE_FILES)} genre rankings and 2 combined rankings to {output_dir}")
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    counts = count_professions()
+    write_rankings(counts)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,44 @@
+"""
+Throughput against accuracy of packing several books per request (fetch_book_data's "packed"
+mode), on the validation set.
+
+The set is extracted and scored once per size in PACK_SIZES with evaluate_extraction, a size of 1
+being the usual one book per request. For each size, the table shows the wall time and books per
+minute, the calls and tokens per book, the protagonist recall and fuzzy profession accuracy, and
+the books re-queried on their own because their answer was missing or malformed in the pack.
+
+    python scripts/benchmark_packing.py
+"""
+from evaluate_extraction import evaluate, rate, SET_FILES
+
+PACK_SIZES = [1, 2, 4, 8]
+EVAL_SET = "validation"
+
+def benchmark(pack_sizes=PACK_SIZES, set_file=SET_FILES[EVAL_SET]):
+    """Returns a row of measures per pack size."""
+    rows = []
+    for pack_size in pack_sizes:
+        results, wall_time = evaluate(set_file, pack_size)
+        scored = results[results["error"].isna()]
+        matched = scored["matched"].sum() if "matched" in scored else 0
+        rows.append({
+            "pack_size": pack_size,
+            "wall_time": wall_time,
+            "books_per_minute": len(results) / wall_time * 60,
+            "calls_per_book": results["calls"].mean(),
+            "tokens_per_book": (results["prompt_tokens"] + results["completion_tokens"]).mean(),
+            "recall": rate(matched, scored["protagonists"].sum()) if matched else float("nan"),
+            "profession_fuzzy": rate(scored["profession_fuzzy"].sum(), matched) if matched else float("nan"),
+            "requeried": (results["plan"] == "packed+requery").sum(),
+            "failed": len(results) - len(scored),
+        })
+    return rows
+
+def print_benchmark(rows):
+    print(f"{'pack':>5}{'wall s':>9}{'books/min':>11}{'calls/book':>12}{'tokens/book':>13}{'recall':>9}{'prof.':>8}{'requeried':>11}{'failed':>8}")
+    for row in rows:
+        print(f"{row['pack_size']:5}{row['wall_time']:9.1f}{row['books_per_minute']:11.1f}{row['calls_per_book']:12.2f}"
+              f"{row['tokens_per_book']:13.0f}{row['recall']:9.3f}{row['profession_fuzzy']:8.3f}{row['requeried']:11}{row['failed']:8}")
+
+if __name__ == '__main__':
+    print_benchmark(benchmark())
@@ -0,0 +1,68 @@
+"""
+Benchmark plot-summary extraction over saved study-guide pages: the original BeautifulSoup
+html.parser + find_all_next() path against the lxml fast path in fetch_book_summaries.py.
+
+Fixture pages are generated with mock_supersummary_server.py if FIXTURE_DIR is empty; saved
+real pages can be dropped into the same directory instead.
+"""
+import os
+import glob
+import time
+from bs4 import BeautifulSoup
+import config
+from fetch_book_summaries import extract_plot_summary
+from mock_supersummary_server import load_books, study_guide_page
+
+FIXTURE_DIR = os.path.join(config.REPO_ROOT, "fixtures", "supersummary")
+REPEATS = 5
+
+def extract_plot_summary_bs4(page_html):
+    """The original extraction: parse with html.parser and walk every element after the header."""
+    soup = BeautifulSoup(page_html, "html.parser")
+    plot_header = soup.find(lambda tag: tag.name in ["strong", "h2", "h3"] and "Plot Summary" in tag.text)
+
+    if not plot_header:
+        return None
+
+    plot_summary = []
+    for sibling in plot_header.find_all_next():
+        if sibling.name in ["h2", "h3", "strong"] and sibling.text.strip() != "Plot Summary":
+            break
+        if sibling.name == "p":
+            plot_summary.append(sibling.get_text(strip=True))
+
+    return " ".join(plot_summary) if plot_summary else None
+
+def save_fixture_pages(fixture_dir):
+    os.makedirs(fixture_dir, exist_ok=True)
+    for slug, (title, author) in load_books().items():
+        with open(os.path.join(fixture_dir, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(study_guide_page(title, author))
+
+def time_extraction(extract, pages):
+    """Return the best per-page time in milliseconds over REPEATS runs, and the extracted summaries."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        summaries = [extract(page) for page in pages]
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages) * 1000, summaries
+
+if __name__ == '__main__':
+    if not glob.glob(os.path.join(FIXTURE_DIR, "*.html")):
+        print(f"No fixture pages found, generating them in {FIXTURE_DIR}")
+        save_fixture_pages(FIXTURE_DIR)
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+
+    bs4_ms, bs4_summaries = time_extraction(extract_plot_summary_bs4, pages)
+    lxml_ms, lxml_summaries = time_extraction(extract_plot_summary, pages)
+    mismatches = sum(a != b for a, b in zip(bs4_summaries, lxml_summaries))
+
+    print(f"Pages: {len(pages)} (best of {REPEATS} runs)")
+    print(f"BeautifulSoup html.parser + find_all_next: {bs4_ms:8.2f} ms/page")
+    print(f"lxml, stopping at next header:            {lxml_ms:8.2f} ms/page")
+    print(f"Speedup: {bs4_ms / lxml_ms:.1f}x, pages with differing summaries: {mismatches}")
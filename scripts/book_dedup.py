@@ -0,0 +1,81 @@
+"""
+Streaming deduplication of book lists on a normalized title/author fingerprint.
+
+Two rows are the same book when their titles match after clean_text (the normalization used to
+match SuperSummary search results) and their author lists hold the same names in any order, so
+"Douglas Preston, Lincoln Child" and "Lincoln Child & Douglas Preston" are one book. Every book
+gets a stable Book ID derived from its fingerprint, which is the same whichever list or run it
+comes from.
+
+The input CSVs are read in chunks and only a sorted array of the 8-byte fingerprint hashes seen so
+far is kept in memory, so memory stays flat however many lists are combined.
+"""
+import os
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+
+CHUNK_SIZE = 50_000  # Rows read at a time
+ID_COLUMN = "Book ID"
+
+# Separators between the names of co-authors
+AUTHOR_SEPARATORS = r",|&|;|\band\b|\bwith\b"
+
+def clean_text(text):
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+def book_fingerprints(titles, authors):
+    """Normalized title and sorted, normalized author names, for Series of titles and authors."""
+    titles = pd.Series(titles, dtype=object).fillna("").astype(str)
+    authors = pd.Series(authors, dtype=object).fillna("").astype(str).str.lower()
+
+    author_keys = authors.str.replace(r"[^a-z0-9]", "", regex=True)
+    several = authors.str.contains(AUTHOR_SEPARATORS, regex=True)
+    author_keys[several] = authors[several].map(
+        lambda names: "+".join(sorted(filter(None, (clean_text(name) for name in re.split(AUTHOR_SEPARATORS, names)))))
+    )
+    return titles.str.lower().str.replace(r"[^a-z0-9]", "", regex=True).to_numpy() + "|" + author_keys.to_numpy()
+
+def book_hashes(titles, authors):
+    """64-bit hash of each book's fingerprint."""
+    digests = b"".join(hashlib.blake2b(fingerprint.encode(), digest_size=8).digest() for fingerprint in book_fingerprints(titles, authors))
+    return np.frombuffer(digests, dtype=">u8").astype(np.uint64)
+
+def format_ids(hashes):
+    return [f"{value:016x}" for value in hashes.tolist()]
+
+def book_id(title, author):
+    """Stable ID of a book: its fingerprint hash as 16 hex digits."""
+    return format_ids(book_hashes([title], [author]))[0]
+
+def dedup_csvs(input_files, output_file, chunksize=CHUNK_SIZE):
+    """
+    Write the first row of every distinct book in `input_files` to `output_file`, with its Book ID
+    as the first column. Other columns are taken from the first file. Returns (rows read, books written).
+    """
+    seen = np.empty(0, dtype=np.uint64)  # Sorted hashes of the books written so far
+    columns = None
+    rows_read = books_written = 0
+
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as out:
+        for input_file in input_files:
+            for chunk in pd.read_csv(input_file, dtype=str, chunksize=chunksize):
+                chunk = chunk.drop(columns=[ID_COLUMN], errors="ignore")
+                if columns is None:
+                    columns = [ID_COLUMN] + list(chunk.columns)
+
+                hashes = book_hashes(chunk["Title"], chunk["Author"])
+                position = np.minimum(np.searchsorted(seen, hashes), max(len(seen) - 1, 0))
+                already_seen = seen[position] == hashes if len(seen) else np.zeros(len(hashes), dtype=bool)
+                keep = ~already_seen & ~pd.Series(hashes).duplicated().to_numpy()
+
+                new_books = chunk[keep].assign(**{ID_COLUMN: format_ids(hashes[keep])})
+                new_books.reindex(columns=columns).to_csv(out, header=rows_read == 0, index=False)
+                seen = np.sort(np.concatenate([seen, hashes[keep]]))
+                rows_read += len(chunk)
+                books_written += len(new_books)
+
+    os.replace(tmp_file, output_file)  # Also safe when output_file is one of the inputs
+    return rows_read, books_written
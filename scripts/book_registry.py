@@ -0,0 +1,107 @@
+"""
+Persistent registry of the books in the pipeline and of the stages completed for each of them.
+
+Books are keyed by the stable Book ID of book_dedup (a hash of the normalized title and authors),
+so stages join on the same ID even when the title or author is spelled slightly differently. For
+every stage in STAGES the registry keeps the books still pending it, so a script looks up the
+books pending its stage by key. On every start, a stage is reconciled with its output file, which
+stays the record of what was done.
+
+    registry = BookRegistry()
+    ids = registry.register(df["Title"], df["Author"])
+    registry.reconcile("extraction", output["Book Title"], output["Book Author"])
+    todo = registry.pending("extraction")
+    ...
+    registry.complete("extraction", [book_id])
+"""
+import os
+import json
+import time
+import sqlite3
+import config
+from book_dedup import book_hashes, format_ids
+
+REGISTRY_FILE = os.path.join(config.DATA_DIR, "book_registry.sqlite")
+STAGES = ["metadata", "extraction"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (book_id TEXT PRIMARY KEY, title TEXT, author TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pending (stage TEXT, book_id TEXT, PRIMARY KEY (stage, book_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS completed (stage TEXT, book_id TEXT, completed_at REAL, PRIMARY KEY (stage, book_id)) WITHOUT ROWID;
+"""
+
+class BookRegistry:
+    def __init__(self, path=REGISTRY_FILE):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def register(self, titles, authors):
+        """Add books not seen before, pending every stage they haven't completed. Returns their IDs."""
+        titles, authors = list(titles), list(authors)
+        ids = format_ids(book_hashes(titles, authors))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO books VALUES (?, ?, ?)", zip(ids, map(str, titles), map(str, authors))
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO pending SELECT ?1, ?2 "
+                "WHERE NOT EXISTS (SELECT 1 FROM completed WHERE stage = ?1 AND book_id = ?2)",
+                ((stage, book_id) for stage in STAGES for book_id in set(ids)),
+            )
+        return ids
+
+    def pending(self, stage):
+        """IDs of the registered books that haven't completed `stage`."""
+        rows = self.connection.execute("SELECT book_id FROM pending WHERE stage = ?", (stage,))
+        return [book_id for (book_id,) in rows]
+
+    def pending_among(self, stage, book_ids):
+        """The subset of `book_ids` pending `stage`, looked up by key."""
+        rows = self.connection.execute(
+            "SELECT book_id FROM pending WHERE stage = ? AND book_id IN (SELECT value FROM json_each(?))",
+            (stage, json.dumps(list(book_ids))),
+        )
+        return {book_id for (book_id,) in rows}
+
+    def completed(self, stage):
+        rows = self.connection.execute("SELECT book_id FROM completed WHERE stage = ?", (stage,))
+        return {book_id for (book_id,) in rows}
+
+    def complete(self, stage, book_ids):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("DELETE FROM pending WHERE stage = ? AND book_id = ?", ((stage, book_id) for book_id in book_ids))
+            self.connection.executemany("INSERT OR REPLACE INTO completed VALUES (?, ?, ?)", ((stage, book_id, now) for book_id in book_ids))
+
+    def reconcile(self, stage, titles, authors):
+        """
+        Make the completions of `stage` match the books found in its output file: they are marked
+        completed, and books completed earlier but missing from the file are pending again. Run
+        on every start, it catches rows written without being marked complete (a crash between
+        the two) and files edited by hand. Returns the numbers of books completed and reopened.
+        """
+        found = set(self.register(titles, authors))
+        completed = self.completed(stage)
+        added, reopened = found - completed, completed - found
+        self.complete(stage, added)
+        with self.connection:
+            self.connection.executemany("DELETE FROM completed WHERE stage = ? AND book_id = ?", ((stage, book_id) for book_id in reopened))
+            self.connection.executemany("INSERT OR IGNORE INTO pending VALUES (?, ?)", ((stage, book_id) for book_id in reopened))
+        return len(added), len(reopened)
+
+if __name__ == '__main__':
+    with BookRegistry() as registry:
+        total = registry.connection.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        print(f"{total} books registered in {REGISTRY_FILE}")
+        for stage in STAGES:
+            print(f"{stage:12} {len(registry.completed(stage)):6} completed {len(registry.pending(stage)):6} pending")
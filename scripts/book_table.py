@@ -0,0 +1,133 @@
+"""
+Bounded-memory reading of the book list with metadata.
+
+The Description and Summary columns hold blurbs and plot summaries of several KB per book, so
+reading the whole CSV keeps every one of them in memory. iter_chunks reads the CSV CHUNK_SIZE
+rows at a time and parses only the requested columns, and iter_records streams the rows as dicts.
+iter_batches streams Arrow record batches of strings instead, and reports the rows it can't parse.
+
+With a TextBlobs store, the long text columns of each record are written to a file and replaced
+by a BlobText holding their offset and length. The texts are read back through a memory map when
+used, so the texts of books waiting to be processed stay on disk rather than in memory:
+
+    with TextBlobs() as blobs:
+        books = list(iter_records(columns=["Title", "Author", "Summary"], blobs=blobs))
+        summary = text_value(books[0]["Summary"])
+"""
+import os
+import mmap
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import config
+
+BOOK_LIST_FILE = os.path.join(config.DATA_DIR, "book_list_with_metadata.csv")
+BLOB_FILE = os.path.join(config.CACHE_DIR, "book_text.blob")
+
+CHUNK_SIZE = 2_000  # Rows parsed at a time
+BLOCK_SIZE = 1 << 20  # Bytes parsed at a time by iter_batches
+LONG_TEXT_COLUMNS = ["Description", "Summary"]
+
+class BlobText:
+    """A text stored in a TextBlobs file. str() reads it back."""
+    __slots__ = ("blobs", "offset", "length")
+
+    def __init__(self, blobs, offset, length):
+        self.blobs = blobs
+        self.offset = offset
+        self.length = length
+
+    def __str__(self):
+        return self.blobs.read(self.offset, self.length)
+
+    def __repr__(self):
+        return f"BlobText(offset={self.offset}, length={self.length})"
+
+class TextBlobs:
+    """Append-only file of UTF-8 texts, read back through a memory map by offset and length."""
+
+    def __init__(self, path=BLOB_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.file = open(path, "w+b")  # Texts are only kept for the current run
+        self.size = 0
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def put(self, text):
+        data = text.encode("utf-8")
+        blob = BlobText(self, self.size, len(data))
+        self.file.write(data)
+        self.size += len(data)
+        return blob
+
+    def read(self, offset, length):
+        if self._map is None or len(self._map) < offset + length:
+            self.file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.file.close()
+        os.remove(self.path)
+
+def text_value(value):
+    """The text of a record field, reading it back if it was stored out of line."""
+    return str(value) if isinstance(value, BlobText) else value
+
+def read_columns(csv_file=BOOK_LIST_FILE):
+    return list(pd.read_csv(csv_file, nrows=0).columns)
+
+def iter_chunks(csv_file=BOOK_LIST_FILE, columns=None, chunksize=CHUNK_SIZE, **read_csv_kwargs):
+    """DataFrames of at most `chunksize` rows, with only `columns` (all columns if None)."""
+    yield from pd.read_csv(csv_file, usecols=columns, chunksize=chunksize, **read_csv_kwargs)
+
+def chunk_records(chunk, blobs=None):
+    """The rows of a chunk as dicts, with long texts moved to `blobs` if given."""
+    long_columns = [column for column in LONG_TEXT_COLUMNS if column in chunk.columns] if blobs else []
+    for record in chunk.to_dict(orient="records"):
+        for column in long_columns:
+            if isinstance(record[column], str):
+                record[column] = blobs.put(record[column])
+        yield record
+
+def iter_records(csv_file=BOOK_LIST_FILE, columns=None, chunksize=CHUNK_SIZE, blobs=None, **read_csv_kwargs):
+    """Stream the rows of the CSV as dicts, reading `chunksize` rows at a time."""
+    for chunk in iter_chunks(csv_file, columns, chunksize, **read_csv_kwargs):
+        yield from chunk_records(chunk, blobs)
+
+def iter_batches(csv_file=BOOK_LIST_FILE, columns=None, block_size=BLOCK_SIZE, invalid_rows=None):
+    """
+    Arrow record batches of the CSV with only `columns`, every value as a string (empty if
+    missing). Rows with the wrong number of fields are skipped; if `invalid_rows` is a list,
+    their (line number, text) are appended to it.
+    """
+    columns = columns or read_columns(csv_file)
+
+    def on_invalid_row(row):
+        if invalid_rows is not None:
+            invalid_rows.append((row.number, row.text))
+        return "skip"
+
+    reader = pa_csv.open_csv(
+        csv_file,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=on_invalid_row),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: pa.string() for column in columns},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    yield from reader
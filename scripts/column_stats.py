@@ -0,0 +1,147 @@
+"""
+Column statistics of a CSV in one streaming pass, replacing count_value_in_column.py.
+
+For every column in COLUMNS (all columns if None), reports the number of rows, the share of
+empty values and of the SENTINELS the pipeline writes for missing data ("Not Found" for metadata
+that couldn't be fetched, "0" for missing summaries), the number of distinct values and the TOP_K
+most common ones. Only those columns are parsed, BLOCK_SIZE bytes at a time (see
+book_table.iter_batches). Rows with the wrong number of fields are counted and listed rather than
+silently dropped.
+
+With APPROXIMATE set, distinct values are counted with a HyperLogLog sketch and only the
+TOP_K_CAPACITY most common values are tracked, so memory stays bounded on huge inputs (the
+top-k are then approximate too).
+
+    python scripts/column_stats.py
+"""
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+from book_table import BOOK_LIST_FILE, BLOCK_SIZE, iter_batches, read_columns
+
+CSV_FILE = BOOK_LIST_FILE
+COLUMNS = ["Title", "Author", "Genres", "Description", "Summary"]  # None for all columns
+SENTINELS = ["Not Found", "0"]  # Matched ignoring case and surrounding whitespace
+TOP_K = 5
+TOP_VALUE_WIDTH = 60  # Characters of each top value printed
+
+APPROXIMATE = False
+HLL_PRECISION = 14  # 16384 registers, about 0.8% relative error
+TOP_K_CAPACITY = 10_000  # Values tracked per column in approximate mode
+
+INVALID_ROWS_LISTED = 10
+
+def leading_zeros(values):
+    """Number of leading zero bits of each uint64."""
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        top_empty = (values >> np.uint64(64 - shift)) == 0
+        zeros += top_empty * shift
+        values = np.where(top_empty, values << np.uint64(shift), values)
+    return zeros + (values == 0)
+
+class HyperLogLog:
+    """Approximate distinct count, in 2 ** precision one-byte registers."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(leading_zeros(hashes << np.uint64(self.precision)) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # Linear counting is more accurate for small counts
+        return int(round(estimate))
+
+class ColumnStats:
+    def __init__(self, name, approximate=APPROXIMATE):
+        self.name = name
+        self.rows = 0
+        self.empty = 0
+        self.sentinels = Counter()
+        self.counts = Counter()  # Non-empty values
+        self.sketch = HyperLogLog() if approximate else None
+
+    def update(self, array):
+        value_counts = pc.value_counts(array)
+        values = value_counts.field("values").to_pylist()
+        counts = value_counts.field("counts").to_pylist()
+        self.rows += len(array)
+
+        sentinel_keys = {sentinel.lower(): sentinel for sentinel in SENTINELS}
+        batch = Counter()
+        for value, count in zip(values, counts):
+            key = value.strip().lower()
+            if not key:
+                self.empty += count
+                continue
+            if key in sentinel_keys:
+                self.sentinels[sentinel_keys[key]] += count
+            batch[value] = count
+
+        self.counts.update(batch)
+        if self.sketch is not None:
+            self.sketch.add(list(batch))
+            if len(self.counts) > 2 * TOP_K_CAPACITY:  # Pruned in bulk, so each prune sorts TOP_K_CAPACITY new values
+                self.counts = Counter(dict(self.counts.most_common(TOP_K_CAPACITY)))
+
+    def distinct(self):
+        return self.sketch.count() if self.sketch is not None else len(self.counts)
+
+    def rate(self, count):
+        return count / self.rows if self.rows else 0.0
+
+def column_stats(csv_file=CSV_FILE, columns=COLUMNS, approximate=APPROXIMATE, block_size=BLOCK_SIZE):
+    """Return ({column: ColumnStats}, [(line number, text) of each unparsable row])."""
+    header = read_columns(csv_file)
+    columns = columns or header
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"Columns not found in {csv_file}: {', '.join(missing)}")
+
+    stats = {column: ColumnStats(column, approximate) for column in columns}
+    invalid_rows = []
+    for batch in iter_batches(csv_file, columns, block_size, invalid_rows):
+        for column in columns:
+            stats[column].update(batch.column(column))
+    return stats, invalid_rows
+
+def shorten(value, width=TOP_VALUE_WIDTH):
+    value = " ".join(value.split())
+    return value if len(value) <= width else value[:width - 3] + "..."
+
+def print_report(stats, invalid_rows, approximate=APPROXIMATE):
+    sentinel_headers = "".join(f"{sentinel + ' %':>13}" for sentinel in SENTINELS)
+    distinct_header = "~distinct" if approximate else "distinct"
+    width = max([len("Column")] + [len(name) for name in stats]) + 2
+    print(f"{'Column':{width}}{'rows':>10}{'empty %':>10}{sentinel_headers}{distinct_header:>12}")
+    for column in stats.values():
+        sentinel_rates = "".join(f"{column.rate(column.sentinels[sentinel]) * 100:13.2f}" for sentinel in SENTINELS)
+        print(f"{column.name:{width}}{column.rows:10}{column.rate(column.empty) * 100:10.2f}{sentinel_rates}{column.distinct():12}")
+
+    for column in stats.values():
+        print(f"\nTop {TOP_K} values of '{column.name}':")
+        for value, count in column.counts.most_common(TOP_K):
+            print(f"{count:10}  {column.rate(count) * 100:6.2f}%  {shorten(value)}")
+
+    print(f"\n{len(invalid_rows)} rows could not be parsed and were left out")
+    for number, text in invalid_rows[:INVALID_ROWS_LISTED]:
+        print(f"    line {number}: {shorten(text)}")
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    stats, invalid_rows = column_stats()
+    print(f"Read {CSV_FILE} in {time.perf_counter() - start:.2f}s\n")
+    print_report(stats, invalid_rows)
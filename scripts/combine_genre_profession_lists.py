@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 import config
+from table_cache import read_excel_cached
 
 xlsx_files = ['contemporary_fiction.xlsx',
             # 'fantasy.xlsx',
@@ -19,7 +20,7 @@ column_names = ["Profession", "Raw_Count", "Normalized_Count"]
 all_dfs = []
 
 for file in xlsx_files:
-    df = pd.read_excel(os.path.join(config.DATA_DIR, 'genres', file), header=None)
+    df = read_excel_cached(os.path.join(config.DATA_DIR, 'genres', file), header=None)
     df = df.iloc[:, :3]
     df.columns = column_names
 
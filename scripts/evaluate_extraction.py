@@ -0,0 +1,252 @@
+"""
+Score the extraction of fetch_book_data.py against the hand-checked test or validation set.
+
+Every book of EVAL_SET is extracted concurrently (at most fetch_book_data.MAX_CONCURRENCY at a
+time, within its rate limits), with the current prompt and MODEL_CASCADE. With REPLAY set, only cached
+responses are used, so a previous run is re-scored offline and books without a cached answer
+count as failed. Each extraction is compared with the labels:
+
+- protagonist recall: labelled protagonists matched by a predicted protagonist, on normalized
+  names (exact, shared names or similar spelling, from NAME_MATCH_SCORE)
+- profession exact / fuzzy: matched protagonists with a predicted profession equal to a labelled
+  one after normalization, or scoring at least PROFESSION_MATCH_SCORE (profession_index.pair_score)
+- ISCO: the share of predicted codes that are valid ISCO-08 groups, and, for protagonists with
+  labelled codes, agreement on the major group
+
+Accuracy is reported with the wall time, tokens and cost per book, and the run fails (exit status
+1) if protagonist recall or fuzzy profession accuracy is below its floor. Per-book results are
+written to RESULTS_FILE.
+
+    python scripts/evaluate_extraction.py
+"""
+import os
+import re
+import time
+import asyncio
+from difflib import SequenceMatcher
+import pandas as pd
+import config
+import fetch_book_data
+from fetch_book_data import query_book_details_async, query_pack_async, book_context, print_plan_report, print_cascade_report, MAX_CONCURRENCY, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE
+from rate_limiter import RateLimiter
+from profession_index import normalize_label, pair_score
+from isco_codes import parse_isco_column, code_status
+
+EVAL_SET = "validation"  # "validation" or "test"
+PACK_SIZE = 1  # Books per request; above 1, books are queried with fetch_book_data.query_pack_async
+SET_FILES = {
+    "test": os.path.join(config.DATA_DIR, "test_set.csv"),
+    "validation": os.path.join(config.DATA_DIR, "validation_set.csv"),
+}
+RESULTS_FILE = os.path.join(config.DATA_DIR, "generated", f"evaluation_{EVAL_SET}.csv")
+
+# Set REPLAY to True to score cached responses only, without calling any API
+REPLAY = False
+
+NAME_MATCH_SCORE = 0.75
+PROFESSION_MATCH_SCORE = 0.8
+ISCO_AGREEMENT_DIGITS = 1  # Codes agree when their first digits (major group) are the same
+
+# Quality floor: the run fails below these
+MIN_PROTAGONIST_RECALL = 0.7
+MIN_PROFESSION_MATCH = 0.6
+
+def label_characters(book):
+    """The labelled protagonists of a set row, as (name, [professions], character index)."""
+    characters = []
+    index = 1
+    while f"Protagonist {index}" in book:
+        name = book[f"Protagonist {index}"]
+        if pd.notna(name) and str(name).strip():
+            professions = book.get(f"Profession {index}")
+            professions = [p.strip() for p in str(professions).split(",") if p.strip()] if pd.notna(professions) else []
+            characters.append((str(name), professions, index - 1))
+        index += 1
+    return characters
+
+def labelled_isco(cells):
+    """{(row, character index): set of code strings} from the ISCO column of a set."""
+    codes = parse_isco_column(cells, nested=True)
+    labels = {}
+    for row, character, code, digits in codes[["row_index", "character_index", "code", "digits"]].itertuples(index=False):
+        if code >= 0:
+            labels.setdefault((row, character), set()).add(str(code).zfill(digits))
+    return labels
+
+def name_score(a, b):
+    a, b = normalize_label(a), normalize_label(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    words_a, words_b = set(a.split()), set(b.split())
+    shared = len(words_a & words_b) / len(words_a | words_b)
+    return max(SequenceMatcher(None, a, b).ratio(), 0.5 + 0.5 * shared if shared else 0.0)
+
+def match_characters(labelled, predicted):
+    """Pair labelled and predicted names greedily by name_score. Returns {labelled index: predicted index}."""
+    scores = sorted(
+        ((name_score(name, guess), i, j) for i, name in enumerate(labelled) for j, guess in enumerate(predicted)),
+        reverse=True,
+    )
+    matches, used = {}, set()
+    for score, i, j in scores:
+        if score < NAME_MATCH_SCORE:
+            break
+        if i not in matches and j not in used:
+            matches[i] = j
+            used.add(j)
+    return matches
+
+def as_list(value):
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    return [str(value)] if value is not None else []
+
+def profession_match(labelled, predicted):
+    """(exact, fuzzy) match between labelled and predicted professions of one character."""
+    labelled = [normalize_label(p) for p in labelled if normalize_label(p)]
+    predicted = [normalize_label(p) for p in predicted if normalize_label(p)]
+    exact = bool(set(labelled) & set(predicted))
+    best = max((max(pair_score(p, l), pair_score(l, p)) for p in predicted for l in labelled), default=0.0)
+    return exact, exact or best >= PROFESSION_MATCH_SCORE
+
+def score_book(book, row, book_data, isco_labels):
+    """Compare one extraction with the labels of its set row."""
+    characters = label_characters(book)
+    protagonists = as_list(book_data.get("Protagonists"))
+    professions = book_data.get("Professions") or []
+    isco = book_data.get("ISCO") or []
+
+    matches = match_characters([name for name, _, _ in characters], protagonists)
+    result = {"protagonists": len(characters), "matched": len(matches), "profession_exact": 0, "profession_fuzzy": 0,
+              "isco_labelled": 0, "isco_agree": 0}
+    for i, j in matches.items():
+        _, labelled_professions, character_index = characters[i]
+        exact, fuzzy = profession_match(labelled_professions, as_list(professions[j]) if j < len(professions) else [])
+        result["profession_exact"] += exact
+        result["profession_fuzzy"] += fuzzy
+
+        labelled_codes = isco_labels.get((row, character_index))
+        if labelled_codes:
+            predicted_codes = as_list(isco[j]) if j < len(isco) else []
+            result["isco_labelled"] += 1
+            result["isco_agree"] += bool(
+                {code[:ISCO_AGREEMENT_DIGITS] for code in labelled_codes}
+                & {code.strip()[:ISCO_AGREEMENT_DIGITS] for code in predicted_codes}
+            )
+
+    predicted_codes = [code.strip() for codes in isco for code in as_list(codes)]
+    result["predicted_codes"] = len(predicted_codes)
+    result["valid_codes"] = valid_code_count(predicted_codes)
+    return result
+
+def valid_code_count(code_strings):
+    digits = [code for code in code_strings if re.fullmatch(r"\d{1,4}", code)]
+    if not digits:
+        return 0
+    codes = pd.DataFrame({"code": [int(code) for code in digits], "digits": [len(code) for code in digits]})
+    return int((code_status(codes) == "valid").sum())
+
+async def extract_all(books, pack_size=PACK_SIZE):
+    """Extract every book concurrently. Returns (book_data or None, error, seconds, usage) per book."""
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def extract_pack(pack):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                results = await query_pack_async(pack, limiter)
+            except Exception as e:
+                return [(None, f"{type(e).__name__}: {e}", time.perf_counter() - start, {})] * len(pack)
+            return [(book_data, error, timings.get("total", time.perf_counter() - start), usage)
+                    for book_data, error, timings, usage in results]
+
+    if pack_size > 1:
+        packs = await asyncio.gather(*(extract_pack(books[i:i + pack_size]) for i in range(0, len(books), pack_size)))
+        return [result for pack in packs for result in pack]
+
+    async def extract(book):
+        async with semaphore:
+            summary, description = book_context(book)
+            usage = {}
+            start = time.perf_counter()
+            try:
+                book_data = await query_book_details_async(book["Title"], book["Author"], limiter, book_summary=summary, book_description=description, usage=usage)
+                return book_data, None, time.perf_counter() - start, usage
+            except Exception as e:
+                return None, f"{type(e).__name__}: {e}", time.perf_counter() - start, usage
+
+    return await asyncio.gather(*(extract(book) for book in books))
+
+def evaluate(set_file=SET_FILES[EVAL_SET], pack_size=PACK_SIZE):
+    """Extract and score every book of a set. Returns a DataFrame with one row per book, and the run's wall time."""
+    df = pd.read_csv(set_file)
+    books = [dict(book, Summary=book.get("Summary")) for book in df.to_dict(orient="records")]
+    isco_labels = labelled_isco(df["ISCO"]) if "ISCO" in df.columns else {}
+
+    start = time.perf_counter()
+    extractions = asyncio.run(extract_all(books, pack_size))
+    wall_time = time.perf_counter() - start
+
+    rows = []
+    for row, (book, (book_data, error, seconds, usage)) in enumerate(zip(books, extractions)):
+        result = {"Title": book["Title"], "Author": book["Author"], "error": error, "seconds": seconds,
+                  "prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0),
+                  "prefix_cached_tokens": usage.get("prefix_cached_tokens", 0), "plan": usage.get("plan"),
+                  "calls": usage.get("calls", 0), "search_calls": usage.get("search_calls", 0),
+                  "cached_calls": usage.get("cached_calls", 0), "cost": usage.get("cost", 0.0), "model": usage.get("model"),
+                  "escalations": max(len(usage.get("tiers") or []) - 1, 0), "tiers": usage.get("tiers")}
+        if book_data is not None:
+            result.update(score_book(book, row, book_data, isco_labels))
+        rows.append(result)
+    return pd.DataFrame(rows), wall_time
+
+def rate(numerator, denominator):
+    return numerator / denominator if denominator else float("nan")
+
+def print_report(results, wall_time):
+    """Print the report and return whether the run meets the quality floor."""
+    scored = results[results["error"].isna()]
+    if scored.empty:
+        print(f"{EVAL_SET} set: no book could be extracted ({results['error'].iloc[0] if len(results) else 'empty set'})")
+        return False
+    protagonists, matched = scored["protagonists"].sum(), scored["matched"].sum()
+    recall = rate(matched, protagonists)
+    profession_exact = rate(scored["profession_exact"].sum(), matched)
+    profession_fuzzy = rate(scored["profession_fuzzy"].sum(), matched)
+
+    print(f"{EVAL_SET} set: {len(results)} books, {len(scored)} extracted, {len(results) - len(scored)} failed")
+    print(f"Protagonist recall     {recall:.3f}  ({matched}/{protagonists})")
+    print(f"Profession exact       {profession_exact:.3f}  (of matched protagonists)")
+    print(f"Profession fuzzy       {profession_fuzzy:.3f}")
+    print(f"Valid ISCO codes       {rate(scored['valid_codes'].sum(), scored['predicted_codes'].sum()):.3f}  ({scored['predicted_codes'].sum()} predicted)")
+    if scored["isco_labelled"].sum():
+        print(f"ISCO agreement         {rate(scored['isco_agree'].sum(), scored['isco_labelled'].sum()):.3f}  ({scored['isco_labelled'].sum()} labelled)")
+    else:
+        print("ISCO agreement         n/a (no labelled codes)")
+
+    calls = round(results["calls"].sum())
+    print(f"\nWall time              {wall_time:.1f}s ({wall_time / max(len(results), 1):.2f}s per book, "
+          f"mean latency {results['seconds'].mean():.2f}s, p95 {results['seconds'].quantile(0.95):.2f}s)")
+    print(f"Tokens per book        {results['prompt_tokens'].mean():.0f} prompt + {results['completion_tokens'].mean():.0f} completion "
+          f"({results['cached_calls'].sum():.0f}/{calls} calls from the cache, estimated)")
+    print(f"Cost per book          ${results['cost'].mean():.4f} (as if uncached)")
+    print_plan_report(results[["plan", "calls", "search_calls", "tiers"]].to_dict(orient="records"))
+    print_cascade_report(results[["tiers"]].to_dict(orient="records"))
+
+    passed = recall >= MIN_PROTAGONIST_RECALL and profession_fuzzy >= MIN_PROFESSION_MATCH
+    print(f"\nQuality floor (recall {MIN_PROTAGONIST_RECALL}, profession {MIN_PROFESSION_MATCH}): {'PASS' if passed else 'FAIL'}")
+    return passed
+
+if __name__ == '__main__':
+    fetch_book_data.cache.replay = REPLAY
+    results, wall_time = evaluate()
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    results.drop(columns="tiers").to_csv(RESULTS_FILE, index=False)
+    passed = print_report(results, wall_time)
+    print(f"Per-book results saved to {RESULTS_FILE}")
+    if not passed:
+        raise SystemExit(1)
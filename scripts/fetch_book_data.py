@@ -1,108 +1,281 @@
 import os
+import io
+import csv
 import json
+import asyncio
 import openai
+from collections import Counter, defaultdict
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import config
+from rate_limiter import RateLimiter, estimate_tokens, count_tokens, truncate_tokens
+from response_cache import ResponseCache, MISSING
+from book_registry import BookRegistry
+from book_dedup import clean_text
+from book_table import BOOK_LIST_FILE, TextBlobs, iter_chunks, chunk_records, text_value
+from isco_codes import code_status
+from profession_store import BOOK_COLUMNS as OUTPUT_COLUMNS, read_legacy_rows
 
-OPENAI_API_KEY = 0 # REPLACE WITH ACTUAL KEY
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+OPENAI_API_KEY = None  # REPLACE WITH ACTUAL KEY, or leave None to use the OPENAI_API_KEY environment variable
+client = openai.OpenAI(api_key=OPENAI_API_KEY)  # Honours OPENAI_BASE_URL, e.g. a local stand-in server
+async_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+CHAT_COMPLETIONS_URL = f"{str(client.base_url).rstrip('/')}/chat/completions"  # Cache key endpoint of chat completions
 
 GOOGLE_API_KEY = 0 # REPLACE WITH ACTUAL KEY
 SEARCH_ENGINE_ID = 0  # REPLACE WITH ACTUAL GOOGLE CUSTOM SEARCH ENGINE ID
+GOOGLE_SEARCH_URL = os.environ.get("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
+
+MODEL = "gpt-4o"  # Model of packed and batch requests
+
+# Models asked in turn, cheapest first, when querying books one at a time. An answer is accepted
+# unless it fails the schema or ISCO checks, leaves required fields unknown or has a self-reported
+# Confidence below MIN_CONFIDENCE; then the next model is asked. Use [MODEL] for a single model.
+MODEL_CASCADE = ["gpt-4o-mini", MODEL]
+MIN_CONFIDENCE = 0.7
+CASCADE_LOG_FILE = os.path.join(config.CACHE_DIR, "cascade_log.jsonl")  # Every model attempt, one JSON line each; None to disable
+
+# USD per million (prompt, completion) tokens
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# "adaptive" makes only the calls a book needs (see query_book_details); "full" always makes the
+# direct call, the web search and the search-augmented call, and merges the two answers
+QUERY_PLAN = "adaptive"
+FULL_PLAN_CALLS = 3  # API calls per book in the full plan
+
+# "sync" queries one book at a time, "async" queries books concurrently, "packed" queries
+# PACK_SIZE books per request concurrently and "batch" submits every prompt through the OpenAI Batch API.
+# Batch mode sends every prompt to MODEL with the full plan: it skips MODEL_CASCADE and its checks, so
+# its answers and costs differ from the other modes. Packed requests also go to MODEL; only the books
+# re-queried on their own go through the cascade.
+EXTRACTION_MODE = "async"
+PACK_SIZE = 4  # Books per request in packed mode
+
+# Async extraction settings
+MAX_CONCURRENCY = 8  # Books in flight at once
+REQUESTS_PER_MINUTE = 500  # OpenAI rate limits for your account tier
+TOKENS_PER_MINUTE = 30_000
+MAX_COMPLETION_TOKENS = 400  # Reserved per call when estimating token usage
+
+# Response cache: a prompt tweak only re-queries the books it affects.
+# Set CACHE_REPLAY to True to reproduce a run offline from cached responses only.
+CACHE_REPLAY = False
+CACHE_MAX_SIZE_MB = 1024
+CACHE_MAX_AGE_DAYS = 180
+cache = ResponseCache(config.CACHE_DIR, max_size_mb=CACHE_MAX_SIZE_MB, max_age_days=CACHE_MAX_AGE_DAYS, replay=CACHE_REPLAY)
+
+# Batch mode settings
+BATCH_STATE_FILE = os.path.join(config.BATCH_DIR, "batch_state.json")
+BATCH_POLL_SECONDS = 60
+MAX_BATCH_REQUESTS = 50_000  # OpenAI limit per batch file
+
+OUTPUT_FILE = os.path.join(config.DATA_DIR, "book_character_professions.csv")
+TOKEN_LOG_FILE = os.path.join(config.CACHE_DIR, "token_log.jsonl")  # Tokens of every call, one JSON line each; None to disable
+
+# Only these columns of the book list are read. With LONG_TEXT_BLOBS, the descriptions and
+# summaries of pending books are kept in a memory-mapped file until their book is queried.
+BOOK_COLUMNS = ["Title", "Author", "Description", "Summary"]
+LONG_TEXT_BLOBS = True
 
 def google_search(query):
     """Search Google for book-related metadata and return snippets."""
-    url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={GOOGLE_API_KEY}&cx={SEARCH_ENGINE_ID}"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
+    cache_params = {"q": query, "cx": SEARCH_ENGINE_ID}
+    data = cache.get(GOOGLE_SEARCH_URL, cache_params)
+
+    if data is MISSING:
+        params = {"q": query, "key": GOOGLE_API_KEY, "cx": SEARCH_ENGINE_ID}
+        response = requests.get(GOOGLE_SEARCH_URL, params=params)
+
+        if response.status_code != 200:
+            print(f"Google Search Error: {response.status_code}")
+            return None
+
         data = response.json()
-        snippets = [item["snippet"] for item in data.get("items", [])[:10]]  # Get top snippets
-        return " ".join(snippets)  # Merge snippets for context
-    else:
-        print(f"Google Search Error: {response.status_code}")
-        return None  
+        cache.set(GOOGLE_SEARCH_URL, cache_params, data)
+
+    snippets = [item["snippet"] for item in data.get("items", [])[:10]]  # Get top snippets
+    return " ".join(snippets)  # Merge snippets for context
+
+# Instructions and answer schema shared by every prompt. They come first and never change, so
+# the provider can reuse its cached processing of this prefix across books.
+PROMPT_INSTRUCTIONS = """You are a literary expert with deep knowledge of every best-selling book of the past decades.
+Use your encyclopedic knowledge of books to retrieve detailed information about the book given at the end, along with any context provided for it.
+
+**Step 1: Determine the Genre and Main Setting**
+- Identify the **genre** of the book. Provide a **one-word or short-phrase descriptor**.
+
+**Step 2: Identify Protagonists (Only POV/Main Characters)**
+- List only the **POV characters** or the **main narrators**.
+- If the book features an **ensemble cast**, return **all protagonists**.
+- Ensure that **supporting characters are not included**.
+
+**Step 3: Assign Correct Professions (No Personality Traits)**
+- Provide the **exact profession(s)** for each protagonist **in the same order**.
+- If a character **changes professions**, list all relevant professions in **chronological order**.
+- Always prefer **specific job titles** over general ones (e.g., "Neurosurgeon" instead of "Doctor").
+- **Strict rule**: Do not return personality-based words or identity markers that are not professions (e.g., "Kindest person" is invalid).
+- If a profession is **completely unknown**, return "Unknown" instead of making assumptions.
+
+**Step 4: Profession Mapping to ISCO Codes**
+- Convert each profession into the **best ISCO code guess**.
+- Ensure that ISCO codes follow the **same order as professions**.
+- If a profession is unknown, return **0**. If unsure, return **9**.
+
+**Step 5: Identify Love Interest (If Applicable)**
+- Identify the **main love interest**, if applicable.
+- Provide their **exact profession(s)** using the same rules as above.
+- Convert their profession(s) into **ISCO codes**, following the same logic.
+
+**Final Output Format (JSON):**
+{
+  "Book Title": "<title of the book below, copied exactly as given>",
+  "Book Author": "<author of the book below, copied exactly as given>",
+  "Genre": "<genre>",
+  "Protagonists": ["<name1>", "<name2>", ...],
+  "Professions": [["<profession1a>", "<profession1b>"], ["<profession2a>"], ...],
+  "ISCO": [["<isco1a>", "<isco1b>"], ["<isco2a>"], ...],
+  "Love Interest": "<name or None>",
+  "Love Interest Profession": ["<profession or None>"],
+  "Love Interest's ISCO": ["<isco or None>"],
+  "Confidence": <number from 0 to 1: how sure you are of the protagonists and their professions>
+}
+"""
+
+# Most tokens a prompt may use; the search results, summary and blurb are cut to fit
+PROMPT_TOKEN_BUDGET = 3_000
+
+def fit_context(texts, budget):
+    """
+    Compact whitespace and cut texts so that together they use at most `budget` tokens. Short
+    texts are kept whole and the rest of the budget is shared equally among the longer ones.
+    """
+    texts = [" ".join(text.split()) if text else "" for text in texts]
+    sizes = [count_tokens(text) for text in texts]
+    fitted = list(texts)
+    remaining = max(budget, 0)
+    for position, index in enumerate(sorted(range(len(texts)), key=sizes.__getitem__)):
+        share = remaining // (len(texts) - position)
+        if sizes[index] > share:
+            fitted[index] = truncate_tokens(texts[index], share)
+        remaining -= count_tokens(fitted[index])
+    return fitted
+
+def book_section(heading, book_title, book_author, search_results=None, book_summary=None, book_blurb=None):
+    """The part of a prompt about one book, with its context cut to fit the PROMPT_TOKEN_BUDGET of a single-book prompt."""
+    book = f"\n**{heading}**\nTitle: {book_title}\nAuthor: {book_author}\n"
+    budget = PROMPT_TOKEN_BUDGET - count_tokens(PROMPT_INSTRUCTIONS) - count_tokens(book) - 50  # Headings
+    search_results, book_summary, book_blurb = fit_context([search_results, book_summary, book_blurb], budget)
+
+    search_context = f"\nHere is additional web search information for context:\n{search_results}\n" if search_results else ""
+    summary_context = f"\nA detailed plot summary is:\n{book_summary}\n" if book_summary else ""
+    description_context = f"\nThe book promotional blurb is:\n{book_blurb}\n" if book_blurb else ""
+    return f"{book}{search_context}{summary_context}{description_context}"
 
 def generate_book_prompt(book_title, book_author, search_results=None, book_summary=None, book_blurb=None):
-    """Generates the prompt for book details, optionally including web search context and book descriptions."""
-    
-    search_context = f"\n\nHere is additional web search information for context:\n{search_results}" if search_results else ""
-    summary_context = f"\n\nA detailed plot summary is:\n{book_summary}" if book_summary else ""
-    description_context = f"\n\nThe book promotional blurb is:\n{book_blurb}" if book_blurb else ""
-
-    return f"""
-    You are a literary expert with deep knowledge of every best-selling book of the past decades. 
-    Use your encyclopedic knowledge of books to retrieve detailed information.{search_context}{summary_context}{description_context}
-
-    **Step 1: Determine the Genre and Main Setting**
-    - Identify the **genre** of the book. Provide a **one-word or short-phrase descriptor**.
-
-    **Step 2: Identify Protagonists (Only POV/Main Characters)**
-    - List only the **POV characters** or the **main narrators**.
-    - If the book features an **ensemble cast**, return **all protagonists**.
-    - Ensure that **supporting characters are not included**.
-
-    **Step 3: Assign Correct Professions (No Personality Traits)**
-    - Provide the **exact profession(s)** for each protagonist **in the same order**.
-    - If a character **changes professions**, list all relevant professions in **chronological order**.
-    - Always prefer **specific job titles** over general ones (e.g., "Neurosurgeon" instead of "Doctor").
-    - **Strict rule**: Do not return personality-based words or identity markers that are not professions (e.g., "Kindest person" is invalid).
-    - If a profession is **completely unknown**, return "Unknown" instead of making assumptions.
-
-    **Step 4: Profession Mapping to ISCO Codes**
-    - Convert each profession into the **best ISCO code guess**.
-    - Ensure that ISCO codes follow the **same order as professions**.
-    - If a profession is unknown, return **0**. If unsure, return **9**.
-
-    **Step 5: Identify Love Interest (If Applicable)**
-    - Identify the **main love interest**, if applicable.
-    - Provide their **exact profession(s)** using the same rules as above.
-    - Convert their profession(s) into **ISCO codes**, following the same logic.
-
-    **Final Output Format (JSON):**
-    {{
-      "Book Title": "{book_title}",
-      "Book Author": "{book_author}",
-      "Genre": "<genre>",
-      "Protagonists": ["<name1>", "<name2>", ...],
-      "Professions": [["<profession1a>", "<profession1b>"], ["<profession2a>"], ...],
-      "ISCO": [["<isco1a>", "<isco1b>"], ["<isco2a>"], ...],
-      "Love Interest": "<name or None>",
-      "Love Interest Profession": ["<profession or None>"],
-      "Love Interest's ISCO": ["<isco or None>"]
-    }}
-    """
-
-def query_book_details(book_title, book_author, book_summary=None, book_description=None):
-    """Retrieve book metadata using both GPT alone and web-enhanced GPT, then merge for best results."""
-
-    # Step 1: Try GPT without any external context
-    direct_prompt = generate_book_prompt(book_title, book_author)
-    response_direct = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": direct_prompt}],
-        response_format={"type": "json_object"},
-        temperature=0.3
-    )
-    direct_data = json.loads(response_direct.choices[0].message.content)  
-
-    # Step 2: Fetch web search results
-    search_query = f"{book_title} by {book_author} main characters and professions"
-    search_results = google_search(search_query)  
-
-    # Step 3: Try GPT with search + metadata (if available)
-    search_prompt = generate_book_prompt(book_title, book_author, search_results, book_summary=book_summary, book_blurb=book_description)
-    response_with_search = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": search_prompt}],
-        response_format={"type": "json_object"},
-        temperature=0.3
-    )
-    search_data = json.loads(response_with_search.choices[0].message.content)  
+    """
+    Generates the prompt for book details: the fixed PROMPT_INSTRUCTIONS, then the book and any web
+    search results, plot summary and blurb, cut to keep the prompt within PROMPT_TOKEN_BUDGET.
+    """
+    return PROMPT_INSTRUCTIONS + book_section("Book", book_title, book_author, search_results, book_summary, book_blurb)
+
+# Appended to PROMPT_INSTRUCTIONS in packed requests, so their prefix is fixed too
+PACKED_INSTRUCTIONS = """
+**Several Books**
+The numbered books below are to be answered independently. Return one JSON object of the output
+format above per book, in the same order as the books, as: {"Books": [<book 1>, <book 2>, ...]}
+Add to each object a "Book Number" field holding the number of its book (1 for **Book 1**, and so on).
+"""
+
+def generate_packed_prompt(books):
+    """The prompt for several book records at once, each with its summary and blurb as in a grounded single-book prompt."""
+    sections = []
+    for number, book in enumerate(books, 1):
+        summary, description = book_context(book)
+        sections.append(book_section(f"Book {number}", book["Title"], book["Author"], book_summary=summary, book_blurb=description))
+    return PROMPT_INSTRUCTIONS + PACKED_INSTRUCTIONS + "".join(sections)
+
+def chat_request(prompt, model=MODEL):
+    """The chat completion parameters for a prompt, which also serve as its cache key."""
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.3
+    }
+
+def record_usage(usage, prompt, content, response=None, model=MODEL):
+    """
+    Log the tokens of one call to TOKEN_LOG_FILE and add them to the `usage` dict, if given, with
+    their cost at PRICES. Answers read from the response cache have no usage reported, so their
+    tokens are counted locally and they are also counted as cached_calls (and costed as if
+    uncached). prefix_cached_tokens are the prompt tokens the provider served from its prompt
+    prefix cache.
+    """
+    from_cache = response is None or response.usage is None
+    if from_cache:
+        prompt_tokens, completion_tokens, prefix_cached_tokens = count_tokens(prompt), count_tokens(content), 0
+    else:
+        prompt_tokens, completion_tokens = response.usage.prompt_tokens, response.usage.completion_tokens
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        prefix_cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+    if TOKEN_LOG_FILE:
+        entry = {"time": time.time(), "model": model, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "prefix_cached_tokens": prefix_cached_tokens, "from_cache": from_cache}
+        with open(TOKEN_LOG_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    if usage is None:
+        return
+    usage["calls"] = usage.get("calls", 0) + 1
+    usage["cached_calls"] = usage.get("cached_calls", 0) + from_cache
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + completion_tokens
+    usage["prefix_cached_tokens"] = usage.get("prefix_cached_tokens", 0) + prefix_cached_tokens
+    prompt_price, completion_price = PRICES.get(model, (float("nan"), float("nan")))
+    usage["cost"] = usage.get("cost", 0) + (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+def format_usage(usage):
+    return f"{usage.get('prompt_tokens', 0):.0f} prompt ({usage.get('prefix_cached_tokens', 0):.0f} prefix-cached) + {usage.get('completion_tokens', 0):.0f} completion tokens"
+
+def chat_completion(prompt, usage=None, model=MODEL):
+    """Send a prompt to the model (or read the cached answer) and parse the JSON answer."""
+    request = chat_request(prompt, model)
+    content = cache.get(CHAT_COMPLETIONS_URL, request)
+    response = None
+
+    if content is MISSING:
+        response = client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+        cache.set(CHAT_COMPLETIONS_URL, request, content)
 
-    # Step 4: Merge results - prevent overuse of "Unknown"
+    record_usage(usage, prompt, content, response, model)
+    return json.loads(content)
+
+async def chat_completion_async(prompt, limiter, usage=None, max_completion_tokens=MAX_COMPLETION_TOKENS, model=MODEL):
+    """Async version of chat_completion that waits for the rate limiter before sending."""
+    request = chat_request(prompt, model)
+    content = cache.get(CHAT_COMPLETIONS_URL, request)
+    response = None
+
+    if content is MISSING:
+        estimated = estimate_tokens(prompt, max_completion_tokens)
+        await limiter.acquire(estimated)
+        response = await async_client.chat.completions.create(**request)
+        if response.usage is not None:
+            limiter.record_usage(estimated, response.usage.total_tokens)
+        content = response.choices[0].message.content
+        cache.set(CHAT_COMPLETIONS_URL, request, content)
+
+    record_usage(usage, prompt, content, response, model)
+    return json.loads(content)
+
+def merge_results(direct_data, search_data):
+    """Merge results - prevent overuse of "Unknown"."""
     def is_unknown(value):
         return value in ["Unknown", None, [], "None"]
 
@@ -115,53 +288,765 @@ def query_book_details(book_title, book_author, book_summary=None, book_descript
             # Use search-enhanced results if they exist
             final_data[key] = search_data[key]
 
-    return final_data  
+    return final_data
 
-df_books = pd.read_csv(os.path.join(config.DATA_DIR, 'books_list_with_metadata.csv'))
-books = df_books.to_dict(orient="records")
+# An answer missing one of these fields (or with an Unknown profession) gets a web search
+REQUIRED_FIELDS = ["Genre", "Protagonists", "Professions", "ISCO"]
+# Fields that are only meaningful together, so they are filled from the same answer
+FIELD_GROUPS = [
+    ["Genre"],
+    ["Protagonists", "Professions", "ISCO"],
+    ["Love Interest", "Love Interest Profession", "Love Interest's ISCO"],
+]
 
-OUTPUT_FILE = os.path.join(config.DATA_DIR, "book_character_professions.csv")
+def is_unknown(value):
+    if isinstance(value, list):
+        return not value or any(is_unknown(item) for item in value)
+    return value is None or str(value).strip() in ["", "Unknown", "None"]
+
+def unknown_fields(data, fields=REQUIRED_FIELDS):
+    return [field for field in fields if is_unknown(data.get(field))]
+
+def fill_missing(data, extra):
+    """Fill the unknown fields of `data` from `extra`, one group of FIELD_GROUPS at a time, keeping everything `data` knows."""
+    filled = dict(data)
+    for group in FIELD_GROUPS:
+        if len(unknown_fields(extra, group)) < len(unknown_fields(data, group)):
+            filled.update({field: extra.get(field) for field in group})
+    return filled
+
+def search_query(book_title, book_author):
+    return f"{book_title} by {book_author} main characters and professions"
+
+def count_search(usage):
+    usage["search_calls"] = usage.get("search_calls", 0) + 1
+
+def timed(timings, stage, func, *args):
+    """Call func(*args) and record how long it took under timings[stage]."""
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+async def timed_async(timings, stage, coroutine):
+    """Await a coroutine and record how long it took under timings[stage]."""
+    start = time.perf_counter()
+    result = await coroutine
+    timings[stage] = time.perf_counter() - start
+    return result
+
+def api_calls(usage):
+    """Every API call recorded in a usage dict: model calls (all tiers of MODEL_CASCADE) and web searches."""
+    return usage.get("calls", 0) + usage.get("search_calls", 0)
+
+def print_plan_report(usages):
+    """
+    Print how many API calls the query plans made, against FULL_PLAN_CALLS per book with a single
+    model. The calls of every model tried count, so escalations in MODEL_CASCADE reduce the saving.
+    """
+    if not usages:
+        return
+    plans = Counter(usage.get("plan") for usage in usages)
+    made = sum(api_calls(usage) for usage in usages)
+    escalated = sum(tier.get("calls", 0) for usage in usages for tier in (usage.get("tiers") or [])[1:])
+    full = FULL_PLAN_CALLS * len(usages)
+    print(f"Query plans: {', '.join(f'{plan} {count}' for plan, count in plans.most_common())}")
+    print(f"{made:.0f} calls for {len(usages)} books ({made / len(usages):.2f} per book, {escalated:.0f} of them after an escalation) "
+          f"instead of {full}: {full - made:.0f} saved ({(full - made) / full * 100:.0f}%)")
+
+def format_timings(timings):
+    return " | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+
+def query_book_details(book_title, book_author, book_summary=None, book_description=None, timings=None, usage=None):
+    """
+    Retrieve book details from the models of MODEL_CASCADE in turn, cheapest first. The answer of
+    a model is accepted unless escalation_reasons finds a problem with it, in which case the next
+    model is asked; the answer of the last model is kept as it is.
+
+    Each model is queried with the calls the book needs, following QUERY_PLAN:
+
+    - with a plot summary, a single call grounded on the summary and blurb
+    - otherwise a direct call first; only if it leaves required fields unknown, a web search and
+      a search-augmented call, whose answer fills just the unknown fields
+
+    Per-stage wall times are stored in `timings`, and token and call counts, the plan used and
+    the models tried in `usage`, if given.
+    """
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    start = time.perf_counter()
+
+    for tier, model in enumerate(MODEL_CASCADE, 1):
+        tier_start, tier_timings, calls_before = time.perf_counter(), {}, api_calls(usage)
+        try:
+            book_data = query_book_plan(book_title, book_author, model, book_summary, book_description, tier_timings, usage)
+            reasons = escalation_reasons(book_data)
+        except json.JSONDecodeError:
+            if tier == len(MODEL_CASCADE):
+                raise
+            book_data, reasons = None, ["invalid JSON"]
+        record_tier(book_title, book_author, model, time.perf_counter() - tier_start, api_calls(usage) - calls_before, reasons, tier_timings, timings, usage)
+        if not reasons:
+            break
+
+    timings["total"] = time.perf_counter() - start
+    return book_data
+
+def query_book_plan(book_title, book_author, model=MODEL, book_summary=None, book_description=None, timings=None, usage=None):
+    """Retrieve book details from one model, with the calls QUERY_PLAN gives the book (see query_book_details)."""
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    if QUERY_PLAN == "full":
+        return query_all_sources(book_title, book_author, book_summary, book_description, timings, usage, model)
+    start = time.perf_counter()
+
+    if book_summary:
+        usage["plan"] = "grounded"
+        grounded_prompt = generate_book_prompt(book_title, book_author, book_summary=book_summary, book_blurb=book_description)
+        book_data = timed(timings, "grounded", chat_completion, grounded_prompt, usage, model)
+    else:
+        usage["plan"] = "direct"
+        book_data = timed(timings, "direct", chat_completion, generate_book_prompt(book_title, book_author), usage, model)
+        if unknown_fields(book_data):
+            usage["plan"] = "direct+search"
+            count_search(usage)
+            search_results = timed(timings, "search", google_search, search_query(book_title, book_author))
+            search_prompt = generate_book_prompt(book_title, book_author, search_results, book_blurb=book_description)
+            book_data = fill_missing(book_data, timed(timings, "augmented", chat_completion, search_prompt, usage, model))
+
+    timings["total"] = time.perf_counter() - start
+    return book_data
+
+def query_all_sources(book_title, book_author, book_summary=None, book_description=None, timings=None, usage=None, model=MODEL):
+    """Retrieve book metadata using both GPT alone and web-enhanced GPT, then merge for best results.
+
+    The direct prompt does not depend on the search, so it runs in a background thread while the
+    search and the search-augmented prompt run. Per-stage wall times are stored in `timings` and
+    token counts in `usage` if given.
+    """
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    usage["plan"] = "full"
+    start = time.perf_counter()
+
+    direct_prompt = generate_book_prompt(book_title, book_author)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Step 1: Try GPT without any external context
+        direct_future = executor.submit(timed, timings, "direct", chat_completion, direct_prompt, usage, model)
+
+        # Step 2: Fetch web search results
+        count_search(usage)
+        search_results = timed(timings, "search", google_search, search_query(book_title, book_author))
+
+        # Step 3: Try GPT with search + metadata (if available)
+        search_prompt = generate_book_prompt(book_title, book_author, search_results, book_summary=book_summary, book_blurb=book_description)
+        search_data = timed(timings, "augmented", chat_completion, search_prompt, usage, model)
+
+        direct_data = direct_future.result()
+
+    timings["total"] = time.perf_counter() - start
+
+    # Step 4: Merge results
+    return merge_results(direct_data, search_data)
+
+async def query_book_details_async(book_title, book_author, limiter, book_summary=None, book_description=None, timings=None, usage=None):
+    """Async version of query_book_details."""
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    start = time.perf_counter()
+
+    for tier, model in enumerate(MODEL_CASCADE, 1):
+        tier_start, tier_timings, calls_before = time.perf_counter(), {}, api_calls(usage)
+        try:
+            book_data = await query_book_plan_async(book_title, book_author, limiter, model, book_summary, book_description, tier_timings, usage)
+            reasons = escalation_reasons(book_data)
+        except json.JSONDecodeError:
+            if tier == len(MODEL_CASCADE):
+                raise
+            book_data, reasons = None, ["invalid JSON"]
+        record_tier(book_title, book_author, model, time.perf_counter() - tier_start, api_calls(usage) - calls_before, reasons, tier_timings, timings, usage)
+        if not reasons:
+            break
+
+    timings["total"] = time.perf_counter() - start
+    return book_data
+
+async def query_book_plan_async(book_title, book_author, limiter, model=MODEL, book_summary=None, book_description=None, timings=None, usage=None):
+    """Async version of query_book_plan."""
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    if QUERY_PLAN == "full":
+        return await query_all_sources_async(book_title, book_author, limiter, book_summary, book_description, timings, usage, model)
+    start = time.perf_counter()
+
+    if book_summary:
+        usage["plan"] = "grounded"
+        grounded_prompt = generate_book_prompt(book_title, book_author, book_summary=book_summary, book_blurb=book_description)
+        book_data = await timed_async(timings, "grounded", chat_completion_async(grounded_prompt, limiter, usage, model=model))
+    else:
+        usage["plan"] = "direct"
+        book_data = await timed_async(timings, "direct", chat_completion_async(generate_book_prompt(book_title, book_author), limiter, usage, model=model))
+        if unknown_fields(book_data):
+            book_data = await search_and_fill_async(book_title, book_author, book_description, book_data, limiter, timings, usage, model)
 
-file_exists = os.path.isfile(OUTPUT_FILE)
+    timings["total"] = time.perf_counter() - start
+    return book_data
 
-if file_exists:
-    df_existing = pd.read_csv(OUTPUT_FILE)
-else:
-    df_existing = pd.DataFrame()
+async def search_and_fill_async(book_title, book_author, book_description, book_data, limiter, timings, usage, model=MODEL):
+    """The web search step of the adaptive plan: fill the unknown fields of `book_data` from a search-augmented call."""
+    usage["plan"] += "+search"
+    count_search(usage)
+    search_results = await timed_async(timings, "search", asyncio.to_thread(google_search, search_query(book_title, book_author)))
+    search_prompt = generate_book_prompt(book_title, book_author, search_results, book_blurb=book_description)
+    search_data = await timed_async(timings, "augmented", chat_completion_async(search_prompt, limiter, usage, model=model))
+    return fill_missing(book_data, search_data)
 
-# Extract already saved books for deduplication
-if not df_existing.empty:
-    existing_books = set(zip(df_existing["Book Title"], df_existing["Book Author"]))
-else:
-    existing_books = set()
+async def query_all_sources_async(book_title, book_author, limiter, book_summary=None, book_description=None, timings=None, usage=None, model=MODEL):
+    """Async version of query_all_sources."""
+    timings = {} if timings is None else timings
+    usage = {} if usage is None else usage
+    usage["plan"] = "full"
+    start = time.perf_counter()
 
-max_protagonists_seen = len([col for col in df_existing.columns if "Protagonist" in col])
+    async def search_then_augment():
+        count_search(usage)
+        search_results = await timed_async(timings, "search", asyncio.to_thread(google_search, search_query(book_title, book_author)))
 
-# Open file in append mode and process books
-for i, book in enumerate(books):
-    # Skip books that are already in the output CSV
-    if (book["Title"], book["Author"]) in existing_books:
-        print(f"Skipping {book['Title']} by {book['Author']} (already processed)")
-        continue
-    
-    description = book["Description"] if pd.notna(book["Description"]) and book["Description"] != "Not found" else None
-    summary = book["Summary"] if pd.notna(book["Summary"]) and book["Summary"] != 0 else None
-    
-    book_data = query_book_details(book["Title"], book["Author"], book_summary=summary, book_description=description)
+        search_prompt = generate_book_prompt(book_title, book_author, search_results, book_summary=book_summary, book_blurb=book_description)
+        return await timed_async(timings, "augmented", chat_completion_async(search_prompt, limiter, usage, model=model))
 
-    df_temp = pd.DataFrame([book_data])
+    direct_data, search_data = await asyncio.gather(
+        timed_async(timings, "direct", chat_completion_async(generate_book_prompt(book_title, book_author), limiter, usage, model=model)),
+        search_then_augment()
+    )
+    timings["total"] = time.perf_counter() - start
+
+    return merge_results(direct_data, search_data)
+
+SCHEMA_FIELDS = ["Book Title", "Book Author", "Genre", "Protagonists", "Professions", "ISCO",
+                 "Love Interest", "Love Interest Profession", "Love Interest's ISCO"]
+
+def schema_problems(book_data):
+    """What makes an answer unusable: missing fields, or professions and codes not given per protagonist."""
+    if not isinstance(book_data, dict):
+        return ["not a JSON object"]
+    problems = [f"no {field}" for field in SCHEMA_FIELDS if field not in book_data]
+    protagonists = book_data.get("Protagonists")
+    if not isinstance(protagonists, list):
+        return problems + ["Protagonists is not a list"]
+    for field in ["Professions", "ISCO"]:
+        value = book_data.get(field)
+        if not isinstance(value, list) or len(value) != len(protagonists) or not all(isinstance(item, list) for item in value):
+            problems.append(f"{field} is not one list per protagonist")
+    return problems
+
+def isco_problems(book_data):
+    """
+    ISCO sanity rules: one code per profession, each a valid ISCO-08 group or a sentinel, 0 only
+    for an Unknown profession, and no 9 (the model unsure of the code).
+    """
+    problems = set()
+    pairs = [(as_answer_list(professions), as_answer_list(codes)) for professions, codes in zip(book_data["Professions"], book_data["ISCO"])]
+    if not is_unknown(book_data.get("Love Interest")):
+        pairs.append((as_answer_list(book_data.get("Love Interest Profession")), as_answer_list(book_data.get("Love Interest's ISCO"))))
+    for professions, codes in pairs:
+        if len(codes) != len(professions):
+            problems.add("ISCO codes not one per profession")
+        codes = [str(code).strip() for code in codes]
+        digits = [code for code in codes if code.isdigit() and len(code) <= 4]
+        if len(digits) < len(codes):
+            problems.add("invalid ISCO code")
+        if not digits:
+            continue
+        status = code_status(pd.DataFrame({"code": [int(code) for code in digits], "digits": [len(code) for code in digits]}))
+        if (status == "invalid").any():
+            problems.add("invalid ISCO code")
+        if (status == "unsure").any():
+            problems.add("unsure ISCO code")
+        if any(code == "0" and not is_unknown(profession) for profession, code in zip(professions, codes)):
+            problems.add("ISCO 0 for a known profession")
+    return sorted(problems)
+
+def as_answer_list(value):
+    return value if isinstance(value, list) else [value]
+
+def answer_confidence(book_data):
+    try:
+        return float(book_data.get("Confidence"))
+    except (TypeError, ValueError):
+        return None
+
+def escalation_reasons(book_data):
+    """Why an answer is passed on to the next model of MODEL_CASCADE: schema or ISCO problems, Unknowns or low confidence."""
+    problems = schema_problems(book_data)
+    if problems:
+        return problems
+    problems = isco_problems(book_data) + [f"unknown {field}" for field in unknown_fields(book_data)]
+    confidence = answer_confidence(book_data)
+    if confidence is None or confidence < MIN_CONFIDENCE:
+        problems.append("low confidence")
+    return problems
+
+def record_tier(book_title, book_author, model, seconds, calls, reasons, tier_timings, timings, usage):
+    """
+    Note one model's attempt at a book: its stage timings in `timings` (named after the model
+    when the cascade has several), its outcome in usage["tiers"], and a line in CASCADE_LOG_FILE.
+    """
+    tier_timings.pop("total", None)
+    prefix = f"{model} " if len(MODEL_CASCADE) > 1 else ""
+    timings.update({prefix + stage: stage_seconds for stage, stage_seconds in tier_timings.items()})
+    usage.setdefault("tiers", []).append({"model": model, "seconds": seconds, "calls": calls, "accepted": not reasons, "reasons": reasons})
+    usage["model"] = model
+
+    if CASCADE_LOG_FILE:
+        entry = {"time": time.time(), "title": str(book_title), "author": str(book_author), "model": model,
+                 "seconds": round(seconds, 3), "calls": calls, "accepted": not reasons, "reasons": reasons}
+        with open(CASCADE_LOG_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+def print_cascade_report(usages):
+    """Print, for each model of MODEL_CASCADE, how many books it was asked about, the share of its answers accepted and its latency."""
+    tiers = [tier for usage in usages for tier in usage.get("tiers") or []]
+    if len(MODEL_CASCADE) < 2 or not tiers:
+        return
+    print("Model cascade:")
+    for model in MODEL_CASCADE:
+        attempts = [tier for tier in tiers if tier["model"] == model]
+        if not attempts:
+            continue
+        accepted = sum(tier["accepted"] for tier in attempts)
+        seconds = sorted(tier["seconds"] for tier in attempts)
+        print(f"  {model:15} {len(attempts):5} books, {accepted} accepted ({accepted / len(attempts) * 100:.0f}%), "
+              f"latency mean {sum(seconds) / len(seconds):.2f}s, p95 {seconds[int(0.95 * (len(seconds) - 1))]:.2f}s")
+    reasons = Counter(reason for tier in tiers if tier["model"] != MODEL_CASCADE[-1] for reason in tier["reasons"])
+    if reasons:
+        print(f"  Escalated for: {', '.join(f'{reason} {count}' for reason, count in reasons.most_common())}")
+
+def book_number(answer):
+    """The "Book Number" a packed answer gives for itself, or None."""
+    try:
+        return int(answer.get("Book Number"))
+    except (TypeError, ValueError):
+        return None
+
+def unpack_answers(books, answers):
+    """
+    The answer for each book of a packed request, matched on the "Book Number" echoed from its
+    **Book N** heading, else on the title and author when only one book and one unnumbered answer
+    have them, else on the position for an answer with neither. None where the answer is missing or fails schema_problems.
+    """
+    answers = answers if isinstance(answers, list) else []
+    by_number = {book_number(answer): answer for answer in answers if isinstance(answer, dict) and book_number(answer) is not None}
+    by_book = defaultdict(list)
+    for answer in answers:
+        if not isinstance(answer, dict) or book_number(answer) is not None:
+            continue
+        by_book[clean_text(str(answer.get("Book Title", ""))), clean_text(str(answer.get("Book Author", "")))].append(answer)
+    keys = [(clean_text(str(book["Title"])), clean_text(str(book["Author"]))) for book in books]
+    matched = []
+    for position, key in enumerate(keys):
+        answer = by_number.get(position + 1)
+        if answer is None and keys.count(key) == 1 and len(by_book.get(key, [])) == 1:
+            answer = by_book[key][0]
+        if (answer is None and position < len(answers) and isinstance(answers[position], dict)
+                and book_number(answers[position]) is None and not clean_text(str(answers[position].get("Book Title", "")))):
+            answer = answers[position]
+        matched.append(answer if answer is not None and not schema_problems(answer) else None)
+    return matched
+
+async def query_pack_async(books, limiter):
+    """
+    Query several book records in one request. A book whose answer is missing or malformed is
+    re-queried on its own with query_book_details_async, and a book without a summary whose answer
+    leaves required fields unknown gets the web search step of the adaptive plan. The packed
+    request's tokens are shared equally among its books.
+
+    Returns (book_data or None, error, timings, usage) per book.
+    """
+    start = time.perf_counter()
+    pack_usage = {}
+    try:
+        answer = await chat_completion_async(generate_packed_prompt(books), limiter, pack_usage, MAX_COMPLETION_TOKENS * len(books))
+        answers = unpack_answers(books, answer.get("Books") if isinstance(answer, dict) else None)
+    except json.JSONDecodeError:
+        answers = [None] * len(books)
+    pack_seconds = time.perf_counter() - start
+
+    async def finish(book, book_data):
+        timings = {"packed": pack_seconds}
+        usage = {key: value / len(books) for key, value in pack_usage.items()}
+        usage["plan"] = "packed"
+        summary, description = book_context(book)
+        try:
+            if book_data is None:
+                book_data = await query_book_details_async(book["Title"], book["Author"], limiter, summary, description, timings, usage)
+                usage["plan"] = "packed+requery"
+            elif not summary and unknown_fields(book_data):
+                book_data = await search_and_fill_async(book["Title"], book["Author"], description, book_data, limiter, timings, usage)
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", timings, usage
+        timings["total"] = time.perf_counter() - start
+        return book_data, None, timings, usage
+
+    return await asyncio.gather(*(finish(book, book_data) for book, book_data in zip(books, answers)))
+
+def book_context(book):
+    """Return the (summary, description) of a book record, or None where missing."""
+    description = text_value(book["Description"])
+    summary = text_value(book["Summary"])
+    description = description if pd.notna(description) and description != "Not found" else None
+    summary = summary if pd.notna(summary) and summary not in (0, "0") else None
+    return summary, description
+
+def flatten_book_data(book_data, num_columns):
+    """
+    The output CSV row of a book: the OUTPUT_COLUMNS in that order (the file is read by
+    position), then Protagonists/Professions spread over numbered columns.
+    """
+    protagonists = book_data.get("Protagonists") or []
+    professions = book_data.get("Professions") or []
+
+    row = {key: book_data.get(key) for key in OUTPUT_COLUMNS}
+    for j in range(num_columns):
+        row[f"Protagonist {j+1}"] = protagonists[j] if j < len(protagonists) else None
+        row[f"Profession {j+1}"] = professions[j] if j < len(professions) else None
+    return row
+
+def repair_output_file(output_file):
+    """
+    Make sure the output CSV ends with a complete row and a newline. A last row left partially
+    written by a crash (unterminated quotes, or fewer fields than the row before it) is dropped;
+    a complete last row that only lacks its newline gets one.
+    """
+    if not os.path.isfile(output_file) or os.path.getsize(output_file) == 0:
+        return
+
+    with open(output_file, "rb+") as f:
+        data = f.read()
+        if data.endswith(b"\n"):
+            return
+        last_newline = data.rfind(b"\n")
+        previous_start = data.rfind(b"\n", 0, max(last_newline, 0)) + 1
+        previous = data[previous_start:last_newline].decode("utf-8", errors="replace") if last_newline >= 0 else ""
+        tail = data[last_newline + 1:].decode("utf-8", errors="replace")
+
+        if is_complete_row(tail, len(next(csv.reader([previous]), []))):
+            f.write(b"\n")
+            print(f"Added the missing newline at the end of {output_file}")
+        else:
+            f.truncate(last_newline + 1)
+            print(f"Removed incomplete last row from {output_file}")
+
+def is_complete_row(text, min_fields=0):
+    """Whether `text` parses as exactly one CSV row, with at least `min_fields` fields."""
+    try:
+        rows = list(csv.reader(io.StringIO(text), strict=True))
+    except csv.Error:
+        return False
+    return len(rows) == 1 and len(rows[0]) >= min_fields
+
+def append_row(output_file, row):
+    """
+    Append one row to the output CSV, without a header like the rows before it, and flush it to
+    disk, so a crash loses at most the row in flight.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(row.values())
+
+    with open(output_file, "a", newline="") as f:
+        f.write(buffer.getvalue())
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_existing_books(output_file, registry):
+    """
+    Return the number of Protagonist/Profession column pairs in the output CSV. The file has no
+    header (older runs wrote none), so it is read by position: the OUTPUT_COLUMNS, then a
+    protagonist and a profession column per character. The registry is reconciled with the books
+    in it on every start (see BookRegistry.reconcile).
+    """
+    repair_output_file(output_file)
+
+    if not os.path.isfile(output_file):
+        return 0
+
+    titles, authors, width = [], [], 0
+    for row in read_legacy_rows(output_file):
+        titles.append(row[0])
+        authors.append(row[1] if len(row) > 1 else "")
+        width = max(width, len(row))
 
-    num_protagonists = len(df_temp["Protagonists"][0]) if df_temp["Protagonists"][0] else 0
-    max_protagonists_seen = max(max_protagonists_seen, num_protagonists)
+    added, reopened = registry.reconcile("extraction", titles, authors)
+    if added or reopened:
+        print(f"Registry reconciled with {output_file}: {added} books marked extracted, {reopened} pending again")
 
-    for j in range(max_protagonists_seen):
-        df_temp[f"Protagonist {j+1}"] = df_temp["Protagonists"].apply(lambda x: x[j] if j < len(x) else None)
-        df_temp[f"Profession {j+1}"] = df_temp["Professions"].apply(lambda x: x[j] if j < len(x) else None)
+    return max(width - len(OUTPUT_COLUMNS), 0) // 2
 
-    df_temp.drop(columns=["Protagonists", "Professions"], inplace=True)
+class OutputWriter:
+    """Appends extracted books to the output CSV, widening the Protagonist/Profession columns as needed."""
 
-    df_temp.to_csv(OUTPUT_FILE, mode="a", header=not file_exists, index=False)
-    file_exists = True
+    def __init__(self, output_file, protagonist_columns, registry):
+        self.output_file = output_file
+        self.registry = registry
+        self.max_protagonists_seen = protagonist_columns
+
+    def save(self, book_data, book):
+        """
+        Append the answer for a book record. The row takes the record's own title and author, not
+        the ones the model echoed, so that reconciling the registry with the file finds its Book ID.
+        """
+        num_protagonists = len(book_data["Protagonists"]) if book_data.get("Protagonists") else 0
+        self.max_protagonists_seen = max(self.max_protagonists_seen, num_protagonists)
+
+        book_data = dict(book_data, **{"Book Title": book["Title"], "Book Author": book["Author"]})
+        row = flatten_book_data(book_data, self.max_protagonists_seen)
+        append_row(self.output_file, row)
+        self.registry.complete("extraction", [book["Book ID"]])
+
+def pending_books(chunks, registry, blobs=None):
+    """
+    Return the books the registry has not seen extracted, once per Book ID, with their Book ID.
+    `chunks` are DataFrames of books, so only the records of pending books are kept.
+    """
+    pending = {}
+    seen = set()
+    for chunk in chunks:
+        ids = pd.Series(registry.register(chunk["Title"], chunk["Author"]), index=chunk.index)
+        wanted = ids.isin(registry.pending_among("extraction", ids)) & ~ids.duplicated() & ~ids.map(pending.__contains__)
+        for book, book_id in zip(chunk_records(chunk[wanted], blobs), ids[wanted]):
+            pending[book_id] = dict(book, **{"Book ID": book_id})
+        seen.update(ids)
+
+    print(f"{len(pending)} books pending extraction, {len(seen) - len(pending)} already processed")
+    return list(pending.values())
+
+def process_books(books, writer):
+    """Query books one at a time."""
+    usages = []
+    for book in books:
+        summary, description = book_context(book)
+        timings, usage = {}, {}
+        usages.append(usage)
+        book_data = query_book_details(book["Title"], book["Author"], book_summary=summary, book_description=description, timings=timings, usage=usage)
+        writer.save(book_data, book)
+
+        print(f"Saved: {book['Title']} by {book['Author']} ({format_timings(timings)} | {format_usage(usage)})")
+        time.sleep(2)
+
+    print_plan_report(usages)
+    print_cascade_report(usages)
+
+async def process_books_async(books, writer):
+    """Query books concurrently, bounded by MAX_CONCURRENCY and the API rate limits."""
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    usages = []
+
+    async def process(book):
+        async with semaphore:
+            summary, description = book_context(book)
+            timings, usage = {}, {}
+            usages.append(usage)
+            try:
+                book_data = await query_book_details_async(book["Title"], book["Author"], limiter, book_summary=summary, book_description=description, timings=timings, usage=usage)
+            except Exception as e:
+                print(f"Error processing {book['Title']} by {book['Author']}: {e}")
+                return
+            # Rows are written from the event loop thread only, so appends never interleave
+            writer.save(book_data, book)
+            print(f"Saved: {book['Title']} by {book['Author']} ({format_timings(timings)} | {format_usage(usage)})")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(process(book) for book in books))
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(books)} books in {elapsed:.1f}s")
+    print_plan_report(usages)
+    print_cascade_report(usages)
+
+async def process_books_packed(books, writer, pack_size=PACK_SIZE):
+    """
+    Query books pack_size per request, with up to MAX_CONCURRENCY requests in flight. Packs go to
+    MODEL; books re-queried on their own go through MODEL_CASCADE.
+    """
+    print(f"Packed mode: packs are queried with {MODEL}; only re-queried books go through MODEL_CASCADE")
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    usages = []
+
+    async def process(pack):
+        async with semaphore:
+            try:
+                results = await query_pack_async(pack, limiter)
+            except Exception as e:
+                print(f"Error processing the {len(pack)} books from {pack[0]['Title']} by {pack[0]['Author']}: {e}")
+                return
+        for book, (book_data, error, timings, usage) in zip(pack, results):
+            usages.append(usage)
+            if error:
+                print(f"Error processing {book['Title']} by {book['Author']}: {error}")
+                continue
+            writer.save(book_data, book)
+            print(f"Saved: {book['Title']} by {book['Author']} ({format_timings(timings)} | {format_usage(usage)})")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(process(books[i:i + pack_size]) for i in range(0, len(books), pack_size)))
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(books)} books in {elapsed:.1f}s, {pack_size} per request")
+    print_plan_report(usages)
+    print_cascade_report(usages)
+
+def book_prompts(book, search_results):
+    """Return the direct and search-augmented prompts for a book."""
+    summary, description = book_context(book)
+    direct_prompt = generate_book_prompt(book["Title"], book["Author"])
+    search_prompt = generate_book_prompt(book["Title"], book["Author"], search_results, book_summary=summary, book_blurb=description)
+    return direct_prompt, search_prompt
+
+def render_batch_requests(books):
+    """
+    Render both prompts for every book and return (prompts per book, batch request lines).
+
+    Prompts whose answer is already cached are left out of the batch, so a resumed run only
+    resubmits the requests that failed or never ran.
+    """
+    def search(book):
+        return google_search(search_query(book["Title"], book["Author"]))
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        search_results = list(executor.map(search, books))
+
+    prompts = []
+    lines = {}
+    for book, results in zip(books, search_results):
+        book_prompt_pair = book_prompts(book, results)
+        prompts.append(book_prompt_pair)
+        for prompt in book_prompt_pair:
+            request = chat_request(prompt)
+            if cache.get(CHAT_COMPLETIONS_URL, request) is MISSING:
+                custom_id = ResponseCache.key(CHAT_COMPLETIONS_URL, request)
+                lines[custom_id] = {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request}
+
+    return prompts, list(lines.values())
+
+def load_batch_state():
+    if os.path.isfile(BATCH_STATE_FILE):
+        with open(BATCH_STATE_FILE) as f:
+            return json.load(f)
+    return {"batches": []}
+
+def save_batch_state(state):
+    os.makedirs(os.path.dirname(BATCH_STATE_FILE), exist_ok=True)
+    tmp_file = f"{BATCH_STATE_FILE}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, BATCH_STATE_FILE)
+
+def submit_batches(lines, state):
+    """Write the request lines to JSONL files, upload them and start one batch per file."""
+    os.makedirs(config.BATCH_DIR, exist_ok=True)
+    for start in range(0, len(lines), MAX_BATCH_REQUESTS):
+        input_file = os.path.join(config.BATCH_DIR, f"batch_input_{int(time.time())}_{start}.jsonl")
+        with open(input_file, "w") as f:
+            for line in lines[start:start + MAX_BATCH_REQUESTS]:
+                f.write(json.dumps(line) + "\n")
+
+        with open(input_file, "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h")
+
+        # Record the batch straight away, so an interrupted run resumes polling instead of resubmitting
+        state["batches"].append({"id": batch.id, "input_file": input_file})
+        save_batch_state(state)
+        print(f"Submitted batch {batch.id} with {len(lines[start:start + MAX_BATCH_REQUESTS])} requests")
+
+def wait_for_batch(batch_id):
+    """Poll a batch until it reaches a final status."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in ["completed", "failed", "expired", "cancelled"]:
+            return batch
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+        time.sleep(BATCH_POLL_SECONDS)
+
+def collect_batch_results(batch, input_file):
+    """Store the successful answers of a finished batch in the response cache. Returns (succeeded, failed)."""
+    with open(input_file) as f:
+        requests_by_id = {line["custom_id"]: line["body"] for line in map(json.loads, f)}
+
+    succeeded = 0
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            try:
+                json.loads(content)
+            except json.JSONDecodeError:
+                continue  # Malformed answers are retried in the next batch
+            cache.set(CHAT_COMPLETIONS_URL, requests_by_id[result["custom_id"]], content)
+            succeeded += 1
+
+    return succeeded, len(requests_by_id) - succeeded
+
+def process_books_batch(pending, writer):
+    """
+    Query books through the OpenAI Batch API, resuming any batch left unfinished by a previous run.
+    Every prompt goes to MODEL with the full plan, without the MODEL_CASCADE escalation checks.
+    """
+    print(f"Batch mode: every book is queried with {MODEL} and the full plan; MODEL_CASCADE and its checks are not applied")
+    state = load_batch_state()
+
+    if not state["batches"]:
+        _, lines = render_batch_requests(pending)
+        if lines:
+            submit_batches(lines, state)
+    else:
+        print(f"Resuming {len(state['batches'])} unfinished batch(es)")
+
+    for entry in list(state["batches"]):
+        batch = wait_for_batch(entry["id"])
+        succeeded, failed = collect_batch_results(batch, entry["input_file"])
+        print(f"Batch {entry['id']} {batch.status}: {succeeded} succeeded, {failed} failed")
+        state["batches"].remove(entry)
+        save_batch_state(state)
+
+    # Search results are cached, so re-rendering the prompts is cheap
+    prompts, missing = render_batch_requests(pending)
+    for book, (direct_prompt, search_prompt) in zip(pending, prompts):
+        direct_content = cache.get(CHAT_COMPLETIONS_URL, chat_request(direct_prompt))
+        search_content = cache.get(CHAT_COMPLETIONS_URL, chat_request(search_prompt))
+        if direct_content is MISSING or search_content is MISSING:
+            continue
+        writer.save(merge_results(json.loads(direct_content), json.loads(search_content)), book)
+        print(f"Saved: {book['Title']} by {book['Author']}")
+
+    if missing:
+        print(f"{len(missing)} requests failed or are missing; re-run to submit them in a new batch")
+
+if __name__ == '__main__':
+    registry = BookRegistry()
+    blobs = TextBlobs() if LONG_TEXT_BLOBS else None
+    protagonist_columns = load_existing_books(OUTPUT_FILE, registry)
+    writer = OutputWriter(OUTPUT_FILE, protagonist_columns, registry)
+    pending = pending_books(iter_chunks(BOOK_LIST_FILE, columns=BOOK_COLUMNS), registry, blobs)
+
+    if EXTRACTION_MODE == "async":
+        asyncio.run(process_books_async(pending, writer))
+    elif EXTRACTION_MODE == "packed":
+        asyncio.run(process_books_packed(pending, writer))
+    elif EXTRACTION_MODE == "batch":
+        process_books_batch(pending, writer)
+    else:
+        process_books(pending, writer)
+    registry.close()
+    if blobs:
+        blobs.close()
 
-    print(f"Saved: {book['Title']} by {book['Author']}")  
-    time.sleep(2)
\ No newline at end of file
+    print(cache.stats())
+    cache.evict()
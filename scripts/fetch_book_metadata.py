@@ -1,25 +1,97 @@
+import os
 import requests
 import time
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import config
+from response_cache import ResponseCache, MISSING
+from book_dedup import ID_COLUMN, book_hashes, format_ids
+from book_registry import BookRegistry
 
 GOOGLE_BOOKS_API_KEY = 0  # Replace with key from https://console.cloud.google.com/
+GOOGLE_BOOKS_URL = os.environ.get("GOOGLE_BOOKS_URL", "https://www.googleapis.com/books/v1/volumes")
+
+MAX_WORKERS = 8  # Concurrent requests to Google Books
+MAX_RETRIES = 5  # Attempts per book on 429/5xx responses
+
+# Set CACHE_REPLAY to True to rebuild the metadata offline from cached responses only
+CACHE_REPLAY = False
+cache = ResponseCache(config.CACHE_DIR, max_size_mb=1024, max_age_days=180, replay=CACHE_REPLAY)
+
+# One pooled session with keep-alive connections, shared by all worker threads
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+class AdaptiveBackoff:
+    """
+    Delay shared by all workers: doubled whenever the API throttles us (429) or fails (5xx),
+    and halved after each success, so requests run flat out until the API pushes back.
+    """
+
+    def __init__(self, initial_delay=1.0, max_delay=60.0):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+    def on_success(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > 0.05 else 0.0
+
+    def on_failure(self, retry_after=None):
+        with self._lock:
+            self.delay = min(self.max_delay, max(self.delay * 2, self.initial_delay, retry_after or 0))
+
+backoff = AdaptiveBackoff()
+
+def get_with_backoff(url, params):
+    """GET a URL, retrying 429/5xx responses with adaptive backoff. Returns None if every attempt fails."""
+    for attempt in range(MAX_RETRIES):
+        backoff.wait()
+        try:
+            response = session.get(url, params=params, timeout=30)
+        except requests.RequestException as e:
+            print(f"Request error: {e}")
+            backoff.on_failure()
+            continue
+
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("Retry-After")
+            backoff.on_failure(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            continue
+
+        backoff.on_success()
+        return response
+
+    return None
 
 def fetch_google_books_metadata(title, author):
-    base_url = "https://www.googleapis.com/books/v1/volumes"
+    """The Google Books metadata of a book, not_found_metadata if it has none, or None if the request failed."""
     params = {
         "q": f"intitle:{title} inauthor:{author}",
         "key": GOOGLE_BOOKS_API_KEY,
         "maxResults": 1
     }
-    
-    response = requests.get(base_url, params=params)
-    if response.status_code != 200:
-        return None
+    cache_params = {key: value for key, value in params.items() if key != "key"}
+
+    data = cache.get(GOOGLE_BOOKS_URL, cache_params)
+    if data is MISSING:
+        response = get_with_backoff(GOOGLE_BOOKS_URL, params)
+        if response is None or response.status_code != 200:
+            return None
+
+        data = response.json()
+        cache.set(GOOGLE_BOOKS_URL, cache_params, data)
 
-    data = response.json()
     if "items" not in data:
-        return None
+        return not_found_metadata(title, author)
 
     book_info = data["items"][0]["volumeInfo"]
 
@@ -34,50 +106,87 @@ def fetch_google_books_metadata(title, author):
         "Description": description
     }
 
-# Load book list from CSV
-input_file = os.path.join(config.RAW_DATA_DIR, "combined_nyt_books.csv")
-existing_metadata_file = os.path.join(config.DATA_DIR, "book_list_with_metadata.csv")
-output_file = os.path.join(config.DATA_DIR, "nyt_books_with_google_metadata.csv")
-
-df = pd.read_csv(input_file, dtype=str)
-df_existing = pd.read_csv(existing_metadata_file)
-
-existing_metadata_dict = {
-    (row["Title"], row["Author"]): row.to_dict()
-    for _, row in df_existing.iterrows()
-}
-
-# Ensure required columns exist
-if not {"Title", "Author"}.issubset(df.columns):
-    raise ValueError("CSV must contain 'Title' and 'Author' columns")
-
-# Fetch metadata for each book
-metadata_list = []
-for _, row in df.iterrows():
-    title, author = row["Title"], row["Author"]
-    if (title, author) in existing_metadata_dict:
-        print(f"Found existing metadata for: {title} by {author}")
-        metadata_list.append(existing_metadata_dict[(title, author)])
-    else:
-        print(f"Fetching metadata for: {title} by {author}")
-        metadata = fetch_google_books_metadata(title, author)
-        
-    if metadata:
-        metadata_list.append(metadata)
-    else:
-        metadata_list.append({
-            "Title": title,
-            "Author": author,
-            "Genres": "Not Found",
-            "Description": "Not Found"
-        })
-    
-    time.sleep(1)  
-
-# Save results to a new CSV file
-output_df = pd.DataFrame(metadata_list)
-output_df.to_csv(output_file, index=False)
-
-print(f"Metadata saved to {output_file}")
+def not_found_metadata(title, author):
+    return {
+        "Title": title,
+        "Author": author,
+        "Genres": "Not Found",
+        "Description": "Not Found"
+    }
+
+def build_existing_metadata_dict(df_existing):
+    """Map Book ID to the existing metadata row, without iterating row by row."""
+    ids = pd.Series(format_ids(book_hashes(df_existing["Title"], df_existing["Author"])), index=df_existing.index)
+    df_existing = df_existing.drop(columns=[ID_COLUMN], errors="ignore")[~ids.duplicated()]
+    return dict(zip(ids[df_existing.index], df_existing.to_dict(orient="records")))
+
+def fetch_all_metadata(books, existing_metadata_dict, registry):
+    """
+    Return metadata for every (title, author). Only books pending the metadata stage in the
+    registry are fetched, plus any completed book whose metadata isn't in existing_metadata_dict.
+    Books whose request failed (throttled or erroring past MAX_RETRIES) are left pending, so the
+    next run retries them; until then they keep their existing metadata, or have no Genres and
+    Description at all.
+    """
+    ids = registry.register([title for title, _ in books], [author for _, author in books])
+    pending = set(registry.pending("metadata"))
+    first_spelling = {}
+    for book_id, book in zip(ids, books):
+        first_spelling.setdefault(book_id, book)
+
+    to_fetch = [book_id for book_id in first_spelling if book_id in pending or book_id not in existing_metadata_dict]
+    print(f"Found existing metadata for {len(first_spelling) - len(to_fetch)} books, fetching {len(to_fetch)}")
+
+    def fetch(book_id):
+        return fetch_google_books_metadata(*first_spelling[book_id])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        fetched = {book_id: metadata for book_id, metadata in zip(to_fetch, executor.map(fetch, to_fetch)) if metadata is not None}
+    elapsed = time.perf_counter() - start
+    registry.complete("metadata", list(fetched))
+
+    if to_fetch:
+        print(f"Fetched {len(to_fetch)} books in {elapsed:.1f}s ({len(to_fetch) / max(elapsed, 1e-9):.1f} books/s)")
+    if len(fetched) < len(to_fetch):
+        print(f"{len(to_fetch) - len(fetched)} requests failed; those books stay pending for the next run")
+
+    # Keep each input row's own spelling of the title and author
+    return [
+        dict(fetched.get(book_id) or existing_metadata_dict.get(book_id) or {}, Title=title, Author=author)
+        for book_id, (title, author) in zip(ids, books)
+    ]
+
+if __name__ == '__main__':
+    # Load book list from CSV
+    input_file = os.path.join(config.RAW_DATA_DIR, "combined_nyt_books.csv")
+    existing_metadata_file = os.path.join(config.DATA_DIR, "book_list_with_metadata.csv")
+    output_file = os.path.join(config.DATA_DIR, "nyt_books_with_google_metadata.csv")
+
+    df = pd.read_csv(input_file, dtype=str)
+    df_existing = pd.read_csv(existing_metadata_file)
+    # Books with metadata from earlier runs; rows of failed requests have none and are retried
+    df_output = pd.read_csv(output_file) if os.path.exists(output_file) else pd.DataFrame(columns=["Title", "Author", "Genres"])
+    df_output = df_output[df_output["Genres"].notna()]
+
+    # Ensure required columns exist
+    if not {"Title", "Author"}.issubset(df.columns):
+        raise ValueError("CSV must contain 'Title' and 'Author' columns")
+
+    existing_metadata_dict = {**build_existing_metadata_dict(df_existing), **build_existing_metadata_dict(df_output)}
+
+    # Fetch metadata for each book
+    registry = BookRegistry()
+    done = pd.concat([df_existing[["Title", "Author"]], df_output[["Title", "Author"]]])
+    registry.reconcile("metadata", done["Title"], done["Author"])
+    books = list(zip(df["Title"], df["Author"]))
+    metadata_list = fetch_all_metadata(books, existing_metadata_dict, registry)
+    registry.close()
 
+    # Save results to a new CSV file
+    output_df = pd.DataFrame(metadata_list)
+    output_df.to_csv(output_file, index=False)
 
+    print(f"Metadata saved to {output_file}")
+    print(cache.stats())
+    cache.evict()
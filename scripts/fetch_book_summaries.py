@@ -1,53 +1,141 @@
 import time
+import json
+import queue
+import threading
 import pandas as pd
 import os
+import requests
+import lxml.html
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import re
 import config
+from book_dedup import clean_text
 
-options = webdriver.ChromeOptions()
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--headless")  # Run in background for speed
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+SUPERSUMMARY_URL = os.environ.get("SUPERSUMMARY_URL", "https://www.supersummary.com/")  # Or a local fixture server
+
+NUM_WORKERS = 4  # Browsers scraping in parallel, each with its own driver
+MAX_ATTEMPTS = 2  # Tries per book; the driver is restarted after a crash
+PAGE_TIMEOUT = 10  # Seconds to wait for search results or a summary to appear
+FAST_PATH = True  # Fetch study-guide pages over plain HTTP, using the browser only if that fails
+
+RESULT_TITLE_XPATH = "//span[contains(@class, 'MuiTypography-titleL')]"
+RESULT_AUTHOR_XPATH = "//p[contains(@class, 'MuiTypography-bodyM')]"
+PLOT_SUMMARY_XPATH = "//strong[contains(text(), 'Plot Summary')]"
 
 # CSV file path
 CSV_FILE = os.path.join(config.DATA_DIR, "book_list_with_metadata.csv")
+CHECKPOINT_FILE = CSV_FILE + ".summaries.jsonl"  # Append-only log of scraped summaries
+
+HEADER_TAGS = {"strong", "h2", "h3"}
+
+# Plain HTTP session for the fast path, shared by all workers
+session = requests.Session()
+session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+def create_driver(driver_path):
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--headless")  # Run in background for speed
+    return webdriver.Chrome(service=Service(driver_path), options=options)
+
+class SummaryCheckpoint:
+    """
+    Append-only JSONL log of scraped summaries, one line per book.
+
+    Each summary is flushed to disk as soon as it is scraped, instead of rewriting the whole CSV
+    per book. The log is compacted into the CSV once, at the end of a run or on interrupt.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.summaries = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            valid_bytes = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # A line cut short by a crash
+                    entry = json.loads(line)
+                    self.summaries[(entry["Title"], entry["Author"])] = entry["Summary"]
+                    valid_bytes += len(line)
+
+            # Drop the partial line so the next append starts on a fresh line
+            with open(path, "rb+") as f:
+                f.truncate(valid_bytes)
+
+    def get(self, title, author):
+        return self.summaries.get((title, author))
 
-def search_supersummary(title, author):
+    def record(self, title, author, summary):
+        line = json.dumps({"Title": title, "Author": author, "Summary": summary}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.summaries[(title, author)] = summary
+
+    def compact(self, df, csv_file):
+        """
+        Write all logged summaries into the CSV, then clear the log. Holds the lock throughout, so a
+        summary recorded by a still-running worker cannot land in the log after it was read and be
+        deleted with it.
+        """
+        with self._lock:
+            keys = pd.Series(list(zip(df["Title"], df["Author"])), index=df.index)
+            logged = keys.map(self.summaries)
+            df["Summary"] = logged.where(logged.notna(), df["Summary"])
+
+            tmp_file = csv_file + ".tmp"
+            df.to_csv(tmp_file, index=False)
+            os.replace(tmp_file, csv_file)
+
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.summaries = {}
+
+def search_supersummary(driver, title, author):
     """Search for a book on SuperSummary from the current page and return the correct result URL if found."""
+    wait = WebDriverWait(driver, PAGE_TIMEOUT)
     try:
         # Check if the search box exists on the current page, otherwise reload SuperSummary homepage
         search_box = driver.find_element(By.ID, "searchFieldAppBar")
-    except:
-        driver.get("https://www.supersummary.com/")
-        time.sleep(3)
-        search_box = driver.find_element(By.ID, "searchFieldAppBar")
+    except WebDriverException:
+        driver.get(SUPERSUMMARY_URL)
+        search_box = wait.until(EC.presence_of_element_located((By.ID, "searchFieldAppBar")))
+
+    # Results of the previous search must go stale before the new ones can be read
+    previous_results = driver.find_elements(By.XPATH, RESULT_TITLE_XPATH)
 
     # Clear the search box and enter the new query
     search_box.clear()
     search_box.send_keys(f"{title}, {author}")
     search_box.send_keys(Keys.RETURN)
 
-    time.sleep(3)
+    try:
+        if previous_results:
+            wait.until(EC.staleness_of(previous_results[0]))
+        wait.until(EC.presence_of_all_elements_located((By.XPATH, RESULT_TITLE_XPATH)))
+    except TimeoutException:
+        print(f"No results for '{title}' by '{author}'.")
+        return None
 
-    book_titles = driver.find_elements(By.XPATH, "//span[contains(@class, 'MuiTypography-titleL')]")
-    book_authors = driver.find_elements(By.XPATH, "//p[contains(@class, 'MuiTypography-bodyM')]")
+    book_titles = driver.find_elements(By.XPATH, RESULT_TITLE_XPATH)
+    book_authors = driver.find_elements(By.XPATH, RESULT_AUTHOR_XPATH)
 
     for i in range(min(len(book_titles), len(book_authors))):
         found_title = book_titles[i].text.strip().lower()
         found_author = book_authors[i].text.strip().lower()
 
-        def clean_text(text):
-            return re.sub(r"[^a-z0-9]", "", text.lower())
-
         if clean_text(title) == clean_text(found_title) and clean_text(author) == clean_text(found_author):
             book_link = book_titles[i].find_element(By.XPATH, "./ancestor::a").get_attribute("href")
             print(f"Found match: {found_title} by {found_author}")
@@ -56,43 +144,106 @@ def search_supersummary(title, author):
     print(f"No match for '{title}' by '{author}'.")
     return None
 
-def scrape_supersummary_plot(book_url):
-    """Scrape the full plot summary from the SuperSummary book page."""
-    driver.get(book_url)
+def extract_plot_summary(page_html):
+    """Extract the plot summary paragraphs from a study-guide page, stopping at the next section header."""
+    root = lxml.html.fromstring(page_html)
 
-    try:
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//strong[contains(text(), 'Plot Summary')]"))
-        )
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        plot_header = soup.find(lambda tag: tag.name in ["strong", "h2", "h3"] and "Plot Summary" in tag.text)
+    plot_summary = []
+    in_summary = False
+    for element in root.iter("strong", "h2", "h3", "p"):
+        is_header = element.tag in HEADER_TAGS
+        if not in_summary:
+            in_summary = is_header and "Plot Summary" in element.text_content()
+            continue
+        if is_header and element.text_content().strip() != "Plot Summary":
+            break
+        if element.tag == "p":
+            # Same whitespace handling as BeautifulSoup's get_text(strip=True)
+            plot_summary.append("".join(part.strip() for part in element.itertext()))
 
-        if not plot_header:
-            print("Plot summary section not found.")
-            return None
+    return " ".join(plot_summary) if plot_summary else None
+
+def fetch_plot_summary_http(book_url):
+    """Fast path: fetch the study-guide page without a browser. Returns None if that doesn't work."""
+    try:
+        response = session.get(book_url, timeout=PAGE_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return extract_plot_summary(response.content)
 
-        plot_summary = []
-        for sibling in plot_header.find_all_next():
-            if sibling.name in ["h2", "h3", "strong"] and sibling.text.strip() != "Plot Summary":
-                break
-            if sibling.name == "p":
-                plot_summary.append(sibling.get_text(strip=True))
+def scrape_supersummary_plot(driver, book_url):
+    """Scrape the full plot summary from the SuperSummary book page."""
+    if FAST_PATH:
+        summary = fetch_plot_summary_http(book_url)
+        if summary:
+            return summary
 
-        return " ".join(plot_summary) if plot_summary else None
+    # The page may need JavaScript to render; load it in the browser
+    driver.get(book_url)
 
-    except Exception as e:
-        print(f"Error extracting summary: {e}")
+    try:
+        WebDriverWait(driver, PAGE_TIMEOUT).until(
+            EC.presence_of_element_located((By.XPATH, PLOT_SUMMARY_XPATH))
+        )
+    except TimeoutException:
+        print("Plot summary section not found.")
         return None
 
-def get_supersummary_summary(title, author):
+    summary = extract_plot_summary(driver.page_source)
+    if not summary:
+        print("Plot summary section not found.")
+    return summary
+
+def get_supersummary_summary(driver, title, author):
     """Check SuperSummary and scrape the plot summary."""
-    book_url = search_supersummary(title, author)
+    book_url = search_supersummary(driver, title, author)
     if book_url:
-        return scrape_supersummary_plot(book_url)
+        return scrape_supersummary_plot(driver, book_url)
     return None
 
-def update_csv_with_summaries(csv_file):
-    """Read the CSV, check for missing summaries, and update it batch-by-batch."""
+def scrape_worker(worker_id, driver_path, books, checkpoint):
+    """Pull books from the shared queue and scrape them with this worker's own browser."""
+    driver = create_driver(driver_path)
+    try:
+        while True:
+            try:
+                title, author = books.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                for attempt in range(1, MAX_ATTEMPTS + 1):
+                    try:
+                        summary = get_supersummary_summary(driver, title, author)
+                        break
+                    except WebDriverException as e:
+                        print(f"[worker {worker_id}] Browser error on '{title}' (attempt {attempt}): {e.msg}")
+                        # The driver may have crashed; start a fresh one
+                        try:
+                            driver.quit()
+                        except WebDriverException:
+                            pass
+                        driver = create_driver(driver_path)
+                else:
+                    continue  # Leave the book unrecorded so the next run retries it
+
+                if summary:
+                    print(f"[worker {worker_id}] Summary added for: {title}")
+                else:
+                    summary = "0"  # Mark as not found to avoid re-searching
+
+                # Save progress after each book
+                checkpoint.record(title, author, summary)
+            except Exception as e:
+                # Any other failure skips just this book, unrecorded so the next run retries it
+                print(f"[worker {worker_id}] Error on '{title}', skipped: {type(e).__name__}: {e}")
+    finally:
+        driver.quit()
+
+def update_csv_with_summaries(csv_file, checkpoint_file=CHECKPOINT_FILE, num_workers=NUM_WORKERS):
+    """Read the CSV, scrape missing summaries in parallel into the checkpoint log, and compact the log into the CSV."""
     if not os.path.exists(csv_file):
         print("CSV file not found.")
         return
@@ -102,24 +253,34 @@ def update_csv_with_summaries(csv_file):
     if "Summary" not in df.columns:
         df["Summary"] = ""
 
-    for i, row in df.iterrows():
-        if pd.isna(row["Summary"]) or row["Summary"] == "":
-            print(f"\n Searching for: {row['Title']} by {row['Author']}")
-
-            summary = get_supersummary_summary(row["Title"], row["Author"])
-            if summary:
-                df.at[i, "Summary"] = summary
-                print(f"Summary added for: {row['Title']}")
-            else:
-                df.at[i, "Summary"] = "0"  # Mark as not found to avoid re-searching
+    checkpoint = SummaryCheckpoint(checkpoint_file)
+    if checkpoint.summaries:
+        print(f"Resuming: {len(checkpoint.summaries)} summaries already in {checkpoint_file}")
 
-            # Save progress after each book
-            df.to_csv(csv_file, index=False)
+    books = queue.Queue()
+    missing = df[df["Summary"].isna() | (df["Summary"] == "")]
+    for title, author in dict.fromkeys(zip(missing["Title"], missing["Author"])):
+        if checkpoint.get(title, author) is None:  # Not scraped in an earlier, interrupted run
+            books.put((title, author))
+    print(f"Scraping {books.qsize()} books with {num_workers} browsers")
 
-            time.sleep(2)  
-
-    print("All books processed!")
+    driver_path = ChromeDriverManager().install()
+    start = time.perf_counter()
+    try:
+        workers = [
+            threading.Thread(target=scrape_worker, args=(i, driver_path, books, checkpoint), daemon=True)
+            for i in range(num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(timeout=1)  # Short timeouts keep the main thread responsive to Ctrl+C
+    finally:
+        # Runs on completion and on interrupt (e.g. Ctrl+C)
+        checkpoint.compact(df, csv_file)
 
-update_csv_with_summaries(CSV_FILE)
+    print(f"All books processed in {time.perf_counter() - start:.1f}s!")
 
-driver.quit()
+if __name__ == '__main__':
+    update_csv_with_summaries(CSV_FILE)
@@ -1,9 +1,17 @@
+import os
 import pandas as pd
 from sklearn.model_selection import train_test_split
 import config
+from book_dedup import ID_COLUMN, book_hashes, format_ids
 
 df = pd.read_csv(os.path.join(config.DATA_DIR, 'book_list_with_metadata.csv'))
 
+# Stable Book IDs, so the sets join with the other stages even if a title is spelled differently
+ids = format_ids(book_hashes(df['Title'], df['Author']))
+df = df.drop(columns=[ID_COLUMN], errors='ignore')
+df.insert(0, ID_COLUMN, ids)
+df = df.drop_duplicates(subset=[ID_COLUMN])
+
 # Randomly select 10% of the rows (without replacement)
 df_sampled = df.sample(frac=0.1, random_state=42)
 
@@ -13,5 +21,5 @@ test_set, validation_set = train_test_split(df_sampled, test_size=0.5, random_st
 test_set = test_set.reset_index(drop=True)
 validation_set = validation_set.reset_index(drop=True)
 
-test_set.to_csv(os.path.join(config.DATA_DIR, 'test_set.csv',index=False))
-validation_set.to_csv(os.path.join(config.DATA_DIR, 'validation_set.csv',index=False))
+test_set.to_csv(os.path.join(config.DATA_DIR, 'test_set.csv'), index=False)
+validation_set.to_csv(os.path.join(config.DATA_DIR, 'validation_set.csv'), index=False)
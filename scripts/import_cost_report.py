@@ -0,0 +1,88 @@
+"""
+Report the import cost of each plot script, to catch startup regressions when regenerating figures.
+
+Every script is run headless (HEADLESS=1, so matplotlib uses the Agg backend and plt.show() is
+skipped) under `python -X importtime`, REPEATS times, keeping the fastest run. The report lists
+the total time spent importing, the slowest top-level imports and the script's wall time. Totals are compared with the previous run
+stored in REPORT_FILE, and imports that got slower by more than REGRESSION_THRESHOLD are flagged.
+
+    python scripts/import_cost_report.py
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+import config
+
+SCRIPTS = [
+    "plot_prestige.py",
+    "plot_profession_prevalence.py",
+    "plot_profession_prevalence_by_genre.py",
+    "plot_profession_prevalence_vs_reality.py",
+    "plot_romance_male_female.py",
+]
+
+REPEATS = 3  # Runs per script; the fastest one is reported, to keep noise out of the comparison
+TOP_IMPORTS = 5  # Slowest top-level imports listed per script
+REGRESSION_THRESHOLD = 1.2  # Flag totals more than 20% slower than the previous run
+REPORT_FILE = os.path.join(config.TABLE_CACHE_DIR, "import_costs.json")
+
+def parse_importtime(stderr):
+    """Cumulative import time in ms of each top-level import, from `-X importtime` output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "imported package" or name.startswith("  "):
+            continue  # Header line, or a module imported by another one
+        imports[name.strip()] = imports.get(name.strip(), 0) + int(cumulative) / 1000
+    return imports
+
+def measure(script):
+    env = dict(os.environ, HEADLESS="1", PYTHONPATH=os.pathsep.join([config.REPO_ROOT, config.SCRIPTS_DIR]))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.join(config.SCRIPTS_DIR, script)],
+                            capture_output=True, text=True, env=env, cwd=config.REPO_ROOT)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imports = parse_importtime(result.stderr)
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1]
+    return {"imports": imports, "import_ms": sum(imports.values()), "wall_ms": wall_ms, "error": error}
+
+def load_report():
+    if os.path.isfile(REPORT_FILE):
+        with open(REPORT_FILE) as f:
+            return json.load(f)
+    return {}
+
+def save_report(report):
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    previous = load_report()
+    report = {}
+
+    for script in SCRIPTS:
+        result = report[script] = min((measure(script) for _ in range(REPEATS)), key=lambda run: run["import_ms"])
+
+        line = f"{script:42} imports {result['import_ms']:7.0f} ms   wall {result['wall_ms']:7.0f} ms"
+        if script in previous:
+            ratio = result["import_ms"] / max(previous[script]["import_ms"], 1e-9)
+            line += f"   {ratio:5.2f}x previous"
+            if ratio > REGRESSION_THRESHOLD:
+                line += "   REGRESSION"
+        print(line)
+
+        slowest = sorted(result["imports"].items(), key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]
+        for name, ms in slowest:
+            print(f"    {ms:7.1f} ms  {name}")
+        if result["error"]:
+            print(f"    Script failed: {result['error']}")
+
+    save_report(report)
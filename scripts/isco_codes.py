@@ -0,0 +1,223 @@
+"""
+Vectorized parsing, validation and roll-up of the ISCO codes in the extraction output.
+
+The ISCO columns hold stringified lists such as "[['9', '2655'], ['0']]" or "[[0], [0]]". Instead
+of calling literal_eval per cell, a whole column is converted to one Arrow string array and its
+character buffer is scanned with NumPy. Every code becomes one row of an exploded table with the
+book, character and position it belongs to (see parse_isco_column).
+
+Codes are checked against the ISCO-08 major, sub-major and minor groups in ISCO_GROUPS_FILE. A
+code's level is its number of digits, so "7" is a major group and "7112" a unit group. Unit groups
+are accepted when their minor group exists. The extraction prompt uses two sentinels: 0 when the
+profession is unknown and 9 when the model is unsure.
+
+    python scripts/isco_codes.py   # Parse the ISCO columns of book_character_professions.csv and report
+"""
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import config
+from profession_store import LEGACY_CSV, read_legacy_rows, parse_list_cell
+
+ISCO_GROUPS_FILE = os.path.join(config.DATA_DIR, "isco08_groups.csv")  # Columns: Code, Level, Title
+
+LEVELS = {"major": 1, "sub_major": 2, "minor": 3, "unit": 4}
+UNKNOWN_CODE = 0  # Profession unknown
+UNSURE_CODE = 9  # Model unsure of the code
+
+ISCO_COLUMN = 3  # Positions in the legacy CSV
+LOVE_INTEREST_ISCO_COLUMN = 6
+
+def load_groups(path=ISCO_GROUPS_FILE):
+    """Lookup tables indexed by code: whether each code exists, and its title, per level 1-3."""
+    groups = pd.read_csv(path, dtype={"Code": str})
+    valid, titles = {}, {}
+    for level in (1, 2, 3):
+        rows = groups[groups["Level"] == level]
+        valid[level] = np.zeros(10 ** level, dtype=bool)
+        titles[level] = np.full(10 ** level, None, dtype=object)
+        codes = rows["Code"].astype(int).to_numpy()
+        valid[level][codes] = True
+        titles[level][codes] = rows["Title"].to_numpy()
+    return valid, titles
+
+VALID_GROUPS, GROUP_TITLES = load_groups()
+
+def parse_isco_column(cells, nested=True):
+    """
+    Explode a column of stringified ISCO lists into one row per code.
+
+    Returns a DataFrame with row_index (position of the cell in `cells`), character_index,
+    position (index of the code within the character's list), code and digits (code length, so
+    "0110" is kept apart from "110"). With nested=True, a flat list holds one code per character,
+    as in the ISCO column. With nested=False, it holds the codes of a single character, as in the
+    love interest's column. Digits inside words (e.g. "<isco1a>") are ignored, and so are codes
+    nested deeper than a list of lists.
+    """
+    array = pa.array(pd.Series(cells, dtype=object).fillna("").astype(str), type=pa.large_string())
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(array.buffers()[2], dtype=np.uint8)[:offsets[-1]] if offsets[-1] else np.zeros(0, np.uint8)
+    size = len(data)
+
+    cell_start = np.zeros(size + 1, dtype=bool)
+    cell_start[offsets[:-1][offsets[:-1] < size]] = True
+    cell_of = np.repeat(np.arange(len(array)), np.diff(offsets))
+
+    is_digit = (data >= ord("0")) & (data <= ord("9"))
+    is_letter = ((data | 0x20) >= ord("a")) & ((data | 0x20) <= ord("z"))
+
+    # Runs of digits, never crossing a cell boundary
+    prev_digit = np.concatenate([[False], is_digit[:-1]]) & ~cell_start[:-1]
+    next_digit = np.concatenate([is_digit[1:], [False]]) & ~cell_start[1:]
+    starts = np.flatnonzero(is_digit & ~prev_digit)
+    ends = np.flatnonzero(is_digit & ~next_digit) + 1
+
+    # Bracket depth before each position, relative to the start of its cell
+    opens = np.concatenate([[0], np.cumsum(data == ord("["))])
+    closes = np.concatenate([[0], np.cumsum(data == ord("]"))])
+    depth_before = opens - closes
+    base_depth = depth_before[offsets[:-1]]
+    depth = depth_before[starts] - base_depth[cell_of[starts]]
+
+    # Inner lists opened so far in the cell: the character index of codes in a list of lists
+    inner_open = np.zeros(size, dtype=bool)
+    open_positions = np.flatnonzero(data == ord("["))
+    inner_open[open_positions] = depth_before[open_positions + 1] - base_depth[cell_of[open_positions]] == 2
+    inner_opens = np.concatenate([[0], np.cumsum(inner_open)])
+
+    # Drop digits that are part of a word, and codes nested deeper than a list of lists
+    before = np.maximum(starts - 1, 0)
+    after = np.minimum(ends, size - 1)
+    in_word = ~cell_start[starts] & is_letter[before] & (starts > 0)
+    in_word |= (ends < size) & ~cell_start[ends] & is_letter[after]
+    keep = ~in_word & (depth <= 2)
+    starts, ends, depth = starts[keep], ends[keep], depth[keep]
+    book = cell_of[starts]
+    index = np.arange(len(starts))
+
+    # Integer value of each run: sum of digit * 10 ** (digits after it)
+    digits = ends - starts
+    lengths = np.minimum(digits, 18)  # Longer runs are invalid codes anyway; keep them within int64
+    run = np.repeat(index, lengths)
+    offset_in_run = np.arange(len(run)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.repeat(ends - lengths, lengths) + offset_in_run
+    powers = 10 ** (np.repeat(lengths, lengths) - offset_in_run - 1)
+    values = np.bincount(run, weights=(data[positions] - ord("0")) * powers, minlength=len(starts)).astype(np.int64)
+
+    # Character: the inner list in a list of lists; in a flat list, one per code (nested) or the only one
+    first_in_cell = np.searchsorted(book, book)
+    flat_character = index - first_in_cell if nested else np.zeros(len(starts), dtype=np.int64)
+    inner_character = inner_opens[starts] - inner_opens[offsets[book]] - 1
+    character = np.where(depth == 2, inner_character, flat_character)
+
+    # Position within the character's list
+    group_start = np.ones(len(starts), dtype=bool)
+    group_start[1:] = (book[1:] != book[:-1]) | (character[1:] != character[:-1])
+    position = index - np.maximum.accumulate(np.where(group_start, index, 0))
+
+    return pd.DataFrame({
+        "row_index": book.astype(np.int32),
+        "character_index": character.astype(np.int16),
+        "position": position.astype(np.int16),
+        "code": np.where(digits > 4, -1, values).astype(np.int32),
+        "digits": digits.astype(np.int8),
+    })
+
+# Validity of every group in one table: the group with code g at level l is at index 10 ** l + g
+GROUP_INDEX_VALID = np.zeros(2 * 10 ** 3, dtype=bool)
+for _level, _valid in VALID_GROUPS.items():
+    GROUP_INDEX_VALID[10 ** _level + np.flatnonzero(_valid)] = True
+
+# Zero-padded label of every group code per level, and the position of each group's title
+GROUP_LABELS = {level: np.char.zfill(np.arange(10 ** level).astype(str), level) for level in (1, 2, 3, 4)}
+TITLE_CATEGORIES = {level: pd.unique(GROUP_TITLES[level][VALID_GROUPS[level]]) for level in VALID_GROUPS}
+TITLE_CODES = {
+    level: pd.Index(TITLE_CATEGORIES[level]).get_indexer(GROUP_TITLES[level]).astype(np.int64)
+    for level in VALID_GROUPS
+}
+STATUSES = ["valid", "unknown", "unsure", "invalid"]
+
+def as_level(level):
+    return LEVELS[level] if isinstance(level, str) else level
+
+def group_codes(codes, level):
+    """The integer group of each code at `level` (1-4), or -1 if the code is less specific than that."""
+    level = as_level(level)
+    digits = codes["digits"].to_numpy().astype(np.int64)
+    values = codes["code"].to_numpy().astype(np.int64)
+    shift = np.clip(digits - level, 0, None)
+    return np.where((digits >= level) & (values >= 0), values // 10 ** shift, -1)
+
+def code_status(codes):
+    """Classify each code as "unknown" (sentinel 0), "unsure" (sentinel 9), "valid" or "invalid"."""
+    digits = codes["digits"].to_numpy().astype(np.int64)
+    values = codes["code"].to_numpy().astype(np.int64)
+    level = np.clip(digits, 1, 3)
+    group = np.where(values >= 0, values // 10 ** np.clip(digits - level, 0, None), 0)
+    valid = (values >= 0) & (digits <= 4) & GROUP_INDEX_VALID[10 ** level + group]
+    status = np.select(
+        [(digits == 1) & (values == UNKNOWN_CODE), (digits == 1) & (values == UNSURE_CODE), valid],
+        [1, 2, 0],
+        3,
+    )
+    return pd.Categorical.from_codes(status, categories=STATUSES)
+
+def roll_up(codes, level):
+    """
+    Add the group of each valid code at `level` ("major", "sub_major", "minor", "unit" or 1-4):
+    `group` as a zero-padded code and, up to minor groups, its `title`. Sentinels, invalid codes
+    and codes less specific than the level get no group.
+    """
+    level = as_level(level)
+    groups = group_codes(codes, level)
+    groups = np.where(code_status(codes).codes == 0, groups, -1)
+
+    result = codes.assign(group=pd.Categorical.from_codes(groups, categories=GROUP_LABELS[level]))
+    if level <= 3:
+        titles = np.where(groups >= 0, TITLE_CODES[level][np.maximum(groups, 0)], -1)
+        result["title"] = pd.Categorical.from_codes(titles, categories=TITLE_CATEGORIES[level])
+    return result
+
+def load_isco_codes(csv_file=LEGACY_CSV):
+    """Parse both ISCO columns of the legacy CSV. Love interests get character_index -1, as in the profession store."""
+    rows = list(read_legacy_rows(csv_file))
+    isco = [row[ISCO_COLUMN] if len(row) > ISCO_COLUMN else "" for row in rows]
+    love_isco = [row[LOVE_INTEREST_ISCO_COLUMN] if len(row) > LOVE_INTEREST_ISCO_COLUMN else "" for row in rows]
+
+    protagonists = parse_isco_column(isco, nested=True).assign(role="protagonist")
+    love_interests = parse_isco_column(love_isco, nested=False).assign(role="love_interest", character_index=np.int16(-1))
+    codes = pd.concat([protagonists, love_interests], ignore_index=True)
+    codes["role"] = codes["role"].astype("category")
+    return codes
+
+if __name__ == '__main__':
+    rows = list(read_legacy_rows())
+    cells = pd.Series([row[ISCO_COLUMN] for row in rows])
+
+    start = time.perf_counter()
+    codes = load_isco_codes()
+    print(f"Parsed {len(codes)} ISCO codes from {len(rows)} books in {(time.perf_counter() - start) * 1000:.1f} ms (including reading the CSV)")
+    print(code_status(codes).value_counts().to_string())
+
+    majors = roll_up(codes, "major")
+    print("\nCodes per major group:")
+    print(majors.groupby("title", observed=True).size().sort_values(ascending=False).to_string())
+
+    # Scale check on a corpus of 100k books
+    large = pd.Series(np.resize(cells.to_numpy(), 100_000))
+    start = time.perf_counter()
+    large_codes = parse_isco_column(large)
+    parse_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for cell in large:
+        parse_list_cell(cell)
+    literal_eval_ms = (time.perf_counter() - start) * 1000
+    timings = []
+    for level in LEVELS:
+        start = time.perf_counter()
+        roll_up(large_codes, level)
+        timings.append(f"{level} {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"\n100,000 books: parsed {len(large_codes)} codes in {parse_ms:.1f} ms (literal_eval per cell: {literal_eval_ms:.1f} ms)")
+    print(f"Roll-up: {', '.join(timings)}")
@@ -0,0 +1,153 @@
+"""
+Render every figure in plots/ from a single process.
+
+Matplotlib, seaborn and scipy are imported once and every workbook is loaded once, before a pool
+of worker processes is started to run the plot_*.py scripts in parallel. Each script runs in its
+own rcParams context, so the style one figure sets doesn't leak into the next one.
+
+A figure is skipped when its PDF exists and neither its input files nor its code (the plot script,
+config.py and the repo modules the script imports, such as table_cache.py) have changed since the
+PDF was last written. Set FORCE to render everything.
+
+    python scripts/make_figures.py
+"""
+import os
+import io
+import ast
+import sys
+import json
+import time
+import runpy
+import hashlib
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import config
+config.HEADLESS = True  # Render to files only; the scripts skip plt.show()
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import seaborn  # noqa: F401 (imported once here so the workers don't have to)
+import scipy.stats  # noqa: F401
+import table_cache
+from table_cache import PLOT_INPUTS, file_hash
+
+NUM_WORKERS = min(len(PLOT_INPUTS), os.cpu_count() or 1)
+FORCE = False  # Render all figures, even unchanged ones
+
+# PDF written by each plot script
+FIGURE_OUTPUTS = {
+    "plot_prestige.py": "representation_vs_prestige.pdf",
+    "plot_profession_prevalence.py": "profession_prevalence_overall.pdf",
+    "plot_profession_prevalence_by_genre.py": "profession_prevalence_by_genre.pdf",
+    "plot_profession_prevalence_vs_reality.py": "real_world_prevalence.pdf",
+    "plot_romance_male_female.py": "romance_romantasy_prevalence.pdf",
+}
+
+# Inputs that are not read through table_cache
+EXTRA_INPUTS = {
+    "plot_prestige.py": ["occ_prestige_scores.csv"],  # Relative to the working directory
+}
+
+CODE_FILES = [os.path.join(config.REPO_ROOT, "config.py")]  # Shared by every script
+STATE_FILE = os.path.join(config.TABLE_CACHE_DIR, "figure_hashes.json")  # Hash of each figure when last written
+
+def input_paths(script):
+    return [os.path.join(config.DATA_DIR, workbook) for workbook in PLOT_INPUTS[script]] + EXTRA_INPUTS.get(script, [])
+
+def imported_modules(path, found=None):
+    """The repo modules (in scripts/ or the repo root) that a script imports, directly or through each other."""
+    found = set() if found is None else found
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            for directory in (config.SCRIPTS_DIR, config.REPO_ROOT):
+                module = os.path.join(directory, name.split(".")[0] + ".py")
+                if os.path.isfile(module) and module not in found:
+                    found.add(module)
+                    imported_modules(module, found)
+                    break
+    return found
+
+def figure_hash(script):
+    """Hash of everything a figure depends on: its input files, its script, the modules it imports and the shared code."""
+    script_path = os.path.join(config.SCRIPTS_DIR, script)
+    code = [script_path] + sorted(imported_modules(script_path) - set(CODE_FILES)) + CODE_FILES
+    sha = hashlib.sha256()
+    for path in input_paths(script) + code:
+        sha.update(path.encode())
+        sha.update(file_hash(path).encode() if os.path.isfile(path) else b"missing")
+    return sha.hexdigest()
+
+def load_state():
+    if os.path.isfile(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
+
+def render_figure(script):
+    """Worker: run one plot script. Returns (script, seconds, captured output, error or None)."""
+    start = time.perf_counter()
+    output = io.StringIO()
+    error = None
+    try:
+        with contextlib.redirect_stdout(output), matplotlib.rc_context():
+            runpy.run_path(os.path.join(config.SCRIPTS_DIR, script), run_name="__main__")
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close("all")
+    return script, time.perf_counter() - start, output.getvalue(), error
+
+def make_figures(force=FORCE, num_workers=NUM_WORKERS):
+    start = time.perf_counter()
+    state = load_state()
+    hashes = {script: figure_hash(script) for script in FIGURE_OUTPUTS}
+
+    pending = [
+        script for script, pdf in FIGURE_OUTPUTS.items()
+        if force or state.get(script) != hashes[script] or not os.path.isfile(os.path.join(config.PLOTS_DIR, pdf))
+    ]
+    for script in FIGURE_OUTPUTS:
+        if script not in pending:
+            print(f"Skipping {FIGURE_OUTPUTS[script]} (unchanged)")
+    if not pending:
+        return
+
+    # Load each table once; forked workers inherit them along with the imported modules
+    for workbook in sorted({workbook for script in pending for workbook in PLOT_INPUTS[script]}):
+        table_cache.preload(os.path.join(config.DATA_DIR, workbook))
+
+    os.makedirs(config.PLOTS_DIR, exist_ok=True)
+    rendered = 0
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(pending)), mp_context=context) as executor:
+        for script, seconds, output, error in executor.map(render_figure, pending):
+            if output.strip():
+                print(output.rstrip())
+            if error:
+                print(f"Failed to render {FIGURE_OUTPUTS[script]} ({script}):\n{error}", file=sys.stderr)
+                state.pop(script, None)
+            else:
+                print(f"Rendered {FIGURE_OUTPUTS[script]} in {seconds:.2f}s")
+                state[script] = hashes[script]
+                rendered += 1
+
+    save_state(state)
+    print(f"Rendered {rendered} of {len(pending)} figure(s) in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    make_figures()
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the OpenAI (chat completions, files and batches), Google Custom Search and
+Google Books APIs, for testing the extraction scripts offline.
+
+Run it, then point the scripts at it:
+
+    python scripts/mock_api_server.py
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    export GOOGLE_SEARCH_URL=http://127.0.0.1:8765/customsearch/v1
+    export GOOGLE_BOOKS_URL=http://127.0.0.1:8765/books/v1/volumes
+"""
+import json
+import re
+import time
+import random
+import itertools
+from email.parser import BytesParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+HOST = "127.0.0.1"
+PORT = 8765
+LATENCY = 0.5  # Seconds added to every response, to mimic network wait
+THROTTLE_RATE = 0.05  # Fraction of Google Books requests answered with 429, to exercise backoff
+BATCH_FAILURE_RATE = 0.1  # Fraction of batch requests that fail, to exercise partial-failure handling
+PACK_DROP_RATE = 0.1  # Fraction of books left out of packed answers, to exercise re-querying
+MINI_UNSURE_RATE = 0.3  # Fraction of answers from "-mini" models with low confidence, to exercise model escalation
+
+files = {}
+batches = {}
+ids = itertools.count(1)
+
+def fake_book_answer(prompt, model="mock"):
+    """Build a JSON answer in the extraction schema, echoing the title and author from the prompt."""
+    title = re.search(r'^Title: (.*)$', prompt, re.MULTILINE)
+    author = re.search(r'^Author: (.*)$', prompt, re.MULTILINE)
+    return {
+        "Book Title": title.group(1) if title else "Unknown",
+        "Book Author": author.group(1) if author else "Unknown",
+        "Genre": "Thriller",
+        "Protagonists": ["Jane Doe"],
+        "Professions": [["Detective"]],
+        "ISCO": [["3355"]],
+        "Love Interest": "None",
+        "Love Interest Profession": ["None"],
+        "Love Interest's ISCO": ["0"],
+        "Confidence": 0.4 if model.endswith("-mini") and random.random() < MINI_UNSURE_RATE else 0.9
+    }
+
+def fake_packed_answer(prompt, model="mock"):
+    """Answer a prompt holding several books with {"Books": [...]}, leaving out some of them."""
+    sections = re.split(r'^\*\*Book \d+\*\*$', prompt, flags=re.MULTILINE)[1:]
+    return {"Books": [{"Book Number": number, **fake_book_answer(section, model)}
+                      for number, section in enumerate(sections, 1) if random.random() >= PACK_DROP_RATE]}
+
+def chat_completion_response(request):
+    prompt = request["messages"][-1]["content"]
+    prompt_tokens = len(prompt) // 4
+    packed = re.search(r'^\*\*Book \d+\*\*$', prompt, re.MULTILINE)
+    model = request.get("model", "mock")
+    answer = fake_packed_answer(prompt, model) if packed else fake_book_answer(prompt, model)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": json.dumps(answer)},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 100 * len(answer.get("Books", [answer])),
+                  "total_tokens": prompt_tokens + 100 * len(answer.get("Books", [answer]))}
+    }
+
+def file_object(file_id, filename, purpose, content):
+    return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed"}
+
+def upload_file(content_type, body):
+    """Store a multipart/form-data file upload and return its file object."""
+    message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    fields = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+    upload = fields["file"]
+    file_id = f"file-{next(ids)}"
+    files[file_id] = upload.get_payload(decode=True)
+    purpose = fields["purpose"].get_payload(decode=True).decode()
+    return file_object(file_id, upload.get_filename(), purpose, files[file_id])
+
+def run_batch(request):
+    """Answer every request of a batch input file at once, failing a random fraction of them."""
+    output, errors = [], []
+    for line in files[request["input_file_id"]].decode().splitlines():
+        line = json.loads(line)
+        if random.random() < BATCH_FAILURE_RATE:
+            errors.append({"id": f"batch_req_{next(ids)}", "custom_id": line["custom_id"], "response": None,
+                           "error": {"code": "server_error", "message": "Mock failure"}})
+        else:
+            output.append({"id": f"batch_req_{next(ids)}", "custom_id": line["custom_id"], "error": None,
+                           "response": {"status_code": 200, "request_id": "mock", "body": chat_completion_response(line["body"])}})
+
+    batch_id = f"batch_{next(ids)}"
+    batch = {"id": batch_id, "object": "batch", "endpoint": request["endpoint"], "input_file_id": request["input_file_id"],
+             "completion_window": request["completion_window"], "status": "completed", "created_at": int(time.time()),
+             "output_file_id": None, "error_file_id": None,
+             "request_counts": {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}}
+    for key, lines in [("output_file_id", output), ("error_file_id", errors)]:
+        if lines:
+            file_id = f"file-{next(ids)}"
+            files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            batch[key] = file_id
+    batches[batch_id] = batch
+    return batch
+
+def search_response(query):
+    return {"items": [{"snippet": f"Snippet {i} about {query}."} for i in range(3)]}
+
+def volumes_response(query):
+    return {"items": [{"volumeInfo": {"categories": ["Fiction"], "description": f"A novel matching {query}."}}]}
+
+class MockHandler(BaseHTTPRequestHandler):
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        url = urlparse(self.path)
+        batch_match = re.search(r"/batches/([^/]+)$", url.path)
+        content_match = re.search(r"/files/([^/]+)/content$", url.path)
+        if url.path.endswith("/customsearch/v1"):
+            query = parse_qs(url.query).get("q", [""])[0]
+            self._send_json(search_response(query))
+        elif url.path.endswith("/books/v1/volumes"):
+            if random.random() < THROTTLE_RATE:
+                self._send_json({"error": {"message": "Rate limit exceeded"}}, status=429)
+            else:
+                query = parse_qs(url.query).get("q", [""])[0]
+                self._send_json(volumes_response(query))
+        elif batch_match and batch_match.group(1) in batches:
+            self._send_json(batches[batch_match.group(1)])
+        elif content_match and content_match.group(1) in files:
+            body = files[content_match.group(1)]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json({"error": {"message": "Not found"}}, status=404)
+
+    def do_POST(self):
+        time.sleep(LATENCY)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.path.endswith("/files"):
+            self._send_json(upload_file(self.headers["Content-Type"], body))
+            return
+
+        request = json.loads(body or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._send_json(chat_completion_response(request))
+        elif self.path.endswith("/batches"):
+            self._send_json(run_batch(request))
+        else:
+            self._send_json({"error": {"message": "Not found"}}, status=404)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer((HOST, PORT), MockHandler)
+    print(f"Mock API server listening on http://{HOST}:{PORT}")
+    server.serve_forever()
@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Publishers Marketplace login and weekly bestseller list pages, for testing
+scrape_bestsellers.py. Lists are published every Sunday, up to NEWEST_LIST.
+
+    python scripts/mock_bestsellers_server.py
+    export PUBLISHERS_MARKETPLACE_URL=http://127.0.0.1:8767
+"""
+import html
+import time
+import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+HOST = "127.0.0.1"
+PORT = 8767
+LATENCY = 0.2  # Seconds added to every response
+NEWEST_LIST = datetime.date(2025, 3, 2)  # Lists after this date don't exist yet
+BOOKS_PER_LIST = 15
+SESSION_COOKIE = "PMSESSION=mock"
+
+LOGIN_PAGE = """<html><body><form method="post" action="/login.php/">
+<input id="username" name="username"><input id="pass" name="pass" type="password">
+<input type="submit" value="Log in"></form></body></html>"""
+
+def list_dates():
+    """Every Sunday from the start of 2023 up to NEWEST_LIST."""
+    date = datetime.date(2023, 1, 1)
+    while date <= NEWEST_LIST:
+        yield date
+        date += datetime.timedelta(days=7)
+
+def format_date(date):
+    return f"{date:%B} {date.day}, {date.year}"
+
+def list_page(publisher, list_type, requested):
+    """The first list published on or after the requested date, with links to the previous and next lists."""
+    dates = list(list_dates())
+    index = next((i for i, date in enumerate(dates) if date >= requested), len(dates) - 1)
+    date = dates[index]
+
+    rows = "".join(
+        f"<tr><td>{rank}</td><td><b>{publisher} {list_type} Book {(date.toordinal() // 7 + rank) % 60}</b>, "
+        f"by Author {(date.toordinal() // 7 + rank) % 60} (Publisher)</td></tr>"
+        for rank in range(1, BOOKS_PER_LIST + 1)
+    )
+    links = ""
+    if index > 0:
+        links += f"<td><b>Previous list</b> <span style='color:#009;'>{format_date(dates[index - 1])}</span></td>"
+    if index < len(dates) - 1:
+        links += f"<td><b>Next list</b> <span style='color:#009;'>{format_date(dates[index + 1])}</span></td>"
+
+    return f"<html><body><h1>{html.escape(publisher)} {html.escape(list_type)} {format_date(date)}</h1><table><tr>{links}</tr>{rows}</table></body></html>"
+
+class BestsellersHandler(BaseHTTPRequestHandler):
+    def _send_html(self, body, status=200, headers=()):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        url = urlparse(self.path)
+        if url.path.startswith("/login.php"):
+            self._send_html(LOGIN_PAGE)
+        elif url.path == "/bestsellers/list.cgi":
+            if SESSION_COOKIE not in self.headers.get("Cookie", ""):
+                self._send_html("<html><body>Please log in.</body></html>", status=403)
+                return
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            requested = datetime.date(int(query["pubYEAR"]), int(query["pubmonth"]), int(query["pubday"]))
+            self._send_html(list_page(query["src"], query["lst"], requested))
+        else:
+            self._send_html("<html><body>Welcome back.</body></html>")
+
+    def do_POST(self):
+        time.sleep(LATENCY)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send_html("", status=303, headers=[("Location", "/"), ("Set-Cookie", f"{SESSION_COOKIE}; Path=/")])
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer((HOST, PORT), BestsellersHandler)
+    print(f"Mock Publishers Marketplace server on http://{HOST}:{PORT}")
+    server.serve_forever()
@@ -0,0 +1,96 @@
+"""
+Local static stand-in for SuperSummary's search and study-guide pages, for testing fetch_book_summaries.py.
+
+Every book in the validation set gets a synthetic study guide. Run it, then point the scraper at it:
+
+    python scripts/mock_supersummary_server.py
+    export SUPERSUMMARY_URL=http://127.0.0.1:8766/
+"""
+import os
+import re
+import html
+import time
+import pandas as pd
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import config
+from book_dedup import clean_text
+
+HOST = "127.0.0.1"
+PORT = 8766
+LATENCY = 0.2  # Seconds added to every response
+
+BOOKS_FILE = os.path.join(config.DATA_DIR, "validation_set.csv")
+
+SEARCH_FORM = """
+<form action="/search" method="get">
+  <input id="searchFieldAppBar" name="q" type="text">
+</form>
+"""
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def load_books():
+    df = pd.read_csv(BOOKS_FILE, usecols=["Title", "Author"])
+    return {slugify(title): (title, author) for title, author in zip(df["Title"], df["Author"])}
+
+def page(body):
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>SuperSummary</title></head><body>{SEARCH_FORM}{body}</body></html>"
+
+def search_page(books, query):
+    query = clean_text(query)
+    results = "".join(
+        f'<div><a href="/study-guide/{slug}/"><span class="MuiTypography-titleL">{html.escape(title)}</span></a>'
+        f'<p class="MuiTypography-bodyM">{html.escape(author)}</p></div>'
+        for slug, (title, author) in books.items()
+        if clean_text(title) in query
+    )
+    return page(f"<main>{results}</main>")
+
+def study_guide_page(title, author):
+    """A study guide with a short plot summary followed by long chapter summaries, like the real pages."""
+    plot = "".join(f"<p>Plot paragraph {i} of {html.escape(title)} by {html.escape(author)}.</p>" for i in range(8))
+    chapters = "".join(
+        f"<h3>Chapter {c}</h3>" + "".join(f"<p>Chapter {c} paragraph {i}, with <em>analysis</em>.</p>" for i in range(20))
+        for c in range(1, 30)
+    )
+    return page(
+        f"<header><nav>{'<a href=#>link</a>' * 50}</nav></header>"
+        f"<article><h1>{html.escape(title)} Summary and Study Guide</h1>"
+        f"<p><strong>Plot Summary</strong></p>{plot}"
+        f"<h2>Chapter Summaries &amp; Analyses</h2>{chapters}</article>"
+    )
+
+class SuperSummaryHandler(BaseHTTPRequestHandler):
+    books = {}
+
+    def _send_html(self, body, status=200):
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        url = urlparse(self.path)
+        guide = re.fullmatch(r"/study-guide/([^/]+)/?", url.path)
+        if url.path == "/":
+            self._send_html(page(""))
+        elif url.path == "/search":
+            self._send_html(search_page(self.books, parse_qs(url.query).get("q", [""])[0]))
+        elif guide and guide.group(1) in self.books:
+            self._send_html(study_guide_page(*self.books[guide.group(1)]))
+        else:
+            self._send_html(page("<p>Not found</p>"), status=404)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+if __name__ == '__main__':
+    SuperSummaryHandler.books = load_books()
+    server = ThreadingHTTPServer((HOST, PORT), SuperSummaryHandler)
+    print(f"Mock SuperSummary server with {len(SuperSummaryHandler.books)} books on http://{HOST}:{PORT}")
+    server.serve_forever()
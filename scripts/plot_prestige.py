@@ -1,11 +1,11 @@
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-from adjustText import adjust_text
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib import rcParams
 from scipy.stats import spearmanr, pearsonr
+from table_cache import read_excel_cached
 import config
 
 # --- Settings ---
@@ -33,7 +33,7 @@ rcParams.update({
 })
 
 # --- Load & prep ---
-df = pd.read_excel(os.path.join(config.DATA_DIR, "profession_ranking_realistic_genres.xlsx"))
+df = read_excel_cached(os.path.join(config.DATA_DIR, "profession_ranking_realistic_genres.xlsx"))
 df = df[df["Profession"] != "Unknown"].copy()
 df = df[df[["Normalized_Count", "Quantity", "Prestige"]].notna().all(axis=1)].copy()
 
@@ -91,10 +91,11 @@ ax.scatter(
 )
 
 
-# Trend line (black) and midlines (gray dashed)
-sns.regplot(data=df, x="Prestige", y="Residual", scatter=False,
-            line_kws=dict(color="black", alpha=0.9, linewidth=1.0),
-            ci=None, ax=ax, truncate=False)
+# Trend line (black, least squares across the whole axis) and midlines (gray dashed)
+slope, intercept = np.polyfit(prestige, residual, 1)
+trend_x = np.linspace(*ax.get_xlim(), 100)
+trend, = ax.plot(trend_x, slope * trend_x + intercept, color="black", alpha=0.9, linewidth=1.0)
+trend.sticky_edges.x[:] = [trend_x[0], trend_x[-1]]  # No margin added beyond the line
 
 ax.axhline(0, color="gray", linestyle="--", linewidth=1.0)
 ax.axvline(avg_prestige, color="gray", linestyle="--", linewidth=1.0)
@@ -172,4 +173,5 @@ ax.set_ylabel("Log10(Fictional prevalence / Real-world prevalence)")
 
 plt.tight_layout()
 plt.savefig(os.path.join(config.PLOTS_DIR, "representation_vs_prestige.pdf"), dpi=600, format="pdf", bbox_inches="tight")
-plt.show()
\ No newline at end of file
+if not config.HEADLESS:
+    plt.show()
\ No newline at end of file
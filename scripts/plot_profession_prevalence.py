@@ -1,10 +1,11 @@
-import pandas as pd
+import os
 import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib import rcParams
+from table_cache import read_excel_cached
 import config
 
-df = pd.read_excel(os.path.join(config.DATA_DIR, 'profession_ranking_all_genres.xlsx'))
+df = read_excel_cached(os.path.join(config.DATA_DIR, 'profession_ranking_all_genres.xlsx'))
 
 df = df[df["Profession"] != "Unknown"].copy()
 df = df[df["Label"] != "Other"].copy()
@@ -1,12 +1,13 @@
+import os
 import textwrap
-import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib import rcParams
+from table_cache import read_excel_cached
 import config
 
-df = pd.read_excel(os.path.join(config.DATA_DIR, 'profession_ranking_all_genres.xlsx'))
+df = read_excel_cached(os.path.join(config.DATA_DIR, 'profession_ranking_all_genres.xlsx'))
 
 genre_columns = ["Contemporary fiction",
                 "Fantasy",
@@ -1,15 +1,15 @@
+import os
 import pandas as pd
-import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib import rcParams
-from scipy.stats import spearmanr, pearsonr
+from table_cache import read_excel_cached
 import config
 
 
 # Load and clean data
-df = pd.read_excel(os.path.join(config.DATA_DIR, "profession_ranking_realistic_genres.xlsx"))
+df = read_excel_cached(os.path.join(config.DATA_DIR, "profession_ranking_realistic_genres.xlsx"))
 df = df[df["Quantity"].notna() & df["Normalized_Count"].notna()].copy()
 df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce")
 df["Normalized_Count"] = pd.to_numeric(df["Normalized_Count"], errors="coerce")
@@ -33,6 +33,8 @@ def _fmt(r, p):
     return f"{r:.3f} (p={p:.3g})"
 
 if n >= 3:
+    from scipy.stats import spearmanr, pearsonr  # Only needed for the diagnostics
+
     resid = df_salary["residual"].to_numpy()
     log_fiction = df_salary["Log_Fiction"].to_numpy()
     salary = df_salary["Salary"].astype(float).to_numpy()
@@ -1,9 +1,11 @@
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
 from matplotlib.colors import Normalize
 import matplotlib.cm as cm
+from table_cache import read_excel_cached
 import config
 
 # Target width in mm: choose 190 (2-col), 140 (1.5-col), or 90 (1-col)
@@ -30,7 +32,7 @@ plt.rcParams.update({
 
 # -------------------- Data processing --------------------
 def process_file(filename, merge_royalty=True):
-    df = pd.read_excel(filename)
+    df = read_excel_cached(filename)
     filtered = df[df["Male"] != "Unknown"].copy()
 
     if merge_royalty:
@@ -111,4 +113,5 @@ for ax in axes:
         spine.set_linewidth(LW_THIN)
 
 plt.savefig(os.path.join(config.PLOTS_DIR, "romance_romantasy_prevalence.pdf"), format="pdf", dpi=600, bbox_inches="tight")
-plt.show()
+if not config.HEADLESS:
+    plt.show()
@@ -0,0 +1,192 @@
+"""
+Map raw profession strings from the extraction output to the canonical professions of the rankings.
+
+The canonical professions are the Profession column of CANONICAL_FILE. A canonical profession
+such as "Lawyer/attorney/law clerk/paralegal" is indexed under each of its alternatives; a
+profession of a single alternative (e.g. "Editor") takes precedence over the same word inside a
+group (e.g. "Film/TV (producer/editor/director/maker)"). A raw string is resolved in three steps:
+
+- exact: its normalized form is one of the alternatives (score 1)
+- token: it ends in the same head noun as an alternative, e.g. "English teacher" -> "Teacher";
+  candidates come from a word index and are scored on how many of the alternative's words the raw
+  string covers. Sharing a single word with an alternative of a group scores at most
+  GROUP_WORD_MAX_SCORE, so "Civil servant" is not taken for "Housekeeper/cleaner/maid/servant"
+- fuzzy: otherwise candidates sharing character trigrams (e.g. misspellings) are scored on string
+  similarity
+
+Pair scores are memoized with an LRU cache, candidates whose cheap upper bound can't beat the best
+score so far are never scored, and every distinct normalized string is resolved only once.
+
+Running the script resolves every profession in the profession store and writes PROFESSION_MAP_FILE
+(Raw, Profession, Score, Method, Candidate), which aggregate_professions.py reads. Only exact
+matches and the reviewed matches of ALIASES_FILE (Raw, Profession; Method "reviewed") get a
+Profession. Token matches from MIN_SCORE and fuzzy matches from FUZZY_MIN_SCORE are suggestions:
+they keep an empty Profession and their Candidate until added to ALIASES_FILE after review.
+
+    python scripts/profession_index.py
+"""
+import os
+import re
+import time
+from functools import lru_cache
+from difflib import SequenceMatcher
+from collections import Counter, defaultdict
+import pandas as pd
+import config
+from table_cache import read_excel_cached
+from profession_store import load_store
+from aggregate_professions import PROFESSION_MAP_FILE
+
+CANONICAL_FILE = os.path.join(config.DATA_DIR, "profession_ranking_all_genres.xlsx")
+ALIASES_FILE = os.path.join(config.DATA_DIR, "profession_aliases.csv")  # Reviewed matches, columns: Raw, Profession
+MIN_SCORE = 0.85  # Token matches from this score are suggested for review
+FUZZY_MIN_SCORE = 0.9  # Similar spelling alone is weaker evidence (e.g. "Sergeant" and "servant")
+GROUP_WORD_MAX_SCORE = 0.8  # A raw string sharing one word with an alternative of a group, e.g. "FBI special agent" and "Athletic director/agent"
+MAX_FUZZY_CANDIDATES = 5  # Alternatives sharing the most trigrams that are scored in the fuzzy step
+SCORE_CACHE_SIZE = 1_000_000
+
+# Raw strings that mean the profession is unknown
+UNKNOWN_ALIASES = ["none", "unknown", "not applicable", "n a", "nan"]
+
+MAP_COLUMNS = ["Raw", "Profession", "Score", "Method", "Candidate"]
+
+def normalize_label(text):
+    """Lowercase, turn punctuation into spaces and collapse whitespace."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(text).lower()).split())
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def combine(similarity, alias_words, raw_words):
+    if alias_words[-1] != raw_words[-1]:  # "Retired nurse" is a nurse, "Retired soccer star" is not retired
+        return similarity
+    coverage = len(set(alias_words) & set(raw_words)) / len(alias_words)
+    return max(similarity, coverage * (0.8 + 0.2 * similarity))
+
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def pair_score(raw, alias):
+    """Similarity of a normalized raw string to a normalized alternative, between 0 and 1."""
+    return combine(SequenceMatcher(None, raw, alias).ratio(), alias.split(), raw.split())
+
+def score_bound(raw, alias):
+    """Cheap upper bound of pair_score, from the string lengths (as SequenceMatcher.real_quick_ratio)."""
+    return combine(2 * min(len(raw), len(alias)) / (len(raw) + len(alias)), alias.split(), raw.split())
+
+class ProfessionIndex:
+    def __init__(self, professions):
+        self.aliases = []  # Normalized alternative
+        self.canonical = []  # Canonical profession of each alternative
+        self.in_group = []  # Whether the alternative is one of several of its profession
+        self.exact = {}
+        self.words = defaultdict(set)
+        self.grams = defaultdict(set)
+
+        # Professions of a single alternative first, so "editor" is Editor rather than part of Film/TV
+        for profession in sorted(professions, key=lambda profession: "/" in str(profession)):
+            for alias in str(profession).split("/"):
+                self.add(normalize_label(alias), profession)
+        if "Unknown" in set(professions):
+            for alias in UNKNOWN_ALIASES:
+                self.add(alias, "Unknown")
+
+    def add(self, alias, profession):
+        if not alias or alias in self.exact:
+            return
+        alias_id = len(self.aliases)
+        self.aliases.append(alias)
+        self.canonical.append(profession)
+        self.in_group.append("/" in str(profession))
+        self.exact[alias] = profession
+        for word in alias.split():
+            self.words[word].add(alias_id)
+        for gram in trigrams(alias):
+            self.grams[gram].add(alias_id)
+
+    def best(self, raw, candidates):
+        """Best scoring candidate alternative. Candidates are scored in order of their upper bound,
+        until no remaining one can beat the best score so far."""
+        best_score, best_id = 0.0, None
+        bounds = sorted((-score_bound(raw, self.aliases[i]), i) for i in candidates)
+        for bound, i in bounds:
+            if -bound <= best_score:
+                break
+            score = self.score(raw, i)
+            if score > best_score:
+                best_score, best_id = score, i
+        return (self.canonical[best_id] if best_id is not None else None), best_score
+
+    def score(self, raw, alias_id):
+        alias = self.aliases[alias_id]
+        score = pair_score(raw, alias)
+        if self.in_group[alias_id] and len(set(alias.split()) & set(raw.split())) < 2:
+            score = min(score, GROUP_WORD_MAX_SCORE)
+        return score
+
+    def resolve(self, raw):
+        """Return (canonical profession, score, method) for one normalized raw string."""
+        if raw in self.exact:
+            return self.exact[raw], 1.0, "exact"
+
+        word_candidates = set().union(*(self.words.get(word, ()) for word in raw.split()))
+        profession, score = self.best(raw, word_candidates)
+        if score >= MIN_SCORE:
+            return profession, score, "token"
+
+        shared = Counter(i for gram in trigrams(raw) for i in self.grams.get(gram, ()))
+        # Ties broken on the alias ID: the Counter's order follows the hash-ordered trigram sets
+        fuzzy_candidates = {i for i, _ in sorted(shared.items(), key=lambda item: (-item[1], item[0]))[:MAX_FUZZY_CANDIDATES]}
+        fuzzy_profession, fuzzy_score = self.best(raw, fuzzy_candidates)
+        if fuzzy_score >= FUZZY_MIN_SCORE or fuzzy_score > score:
+            return fuzzy_profession, fuzzy_score, "fuzzy"
+        return profession, score, "token"
+
+    def resolve_all(self, raw_strings):
+        """Resolve many raw strings at once. Returns a DataFrame with the MAP_COLUMNS."""
+        raw = pd.Series(pd.unique(pd.Series(raw_strings, dtype=object).dropna().astype(str).str.strip()))
+        normalized = raw.map(normalize_label)
+        resolved = {label: self.resolve(label) for label in pd.unique(normalized)}
+
+        candidate = normalized.map(lambda label: resolved[label][0])
+        score = normalized.map(lambda label: resolved[label][1]).round(3)
+        method = normalized.map(lambda label: resolved[label][2])
+        suggested = score >= method.map({"exact": 1.0, "fuzzy": FUZZY_MIN_SCORE}).fillna(MIN_SCORE)
+        return pd.DataFrame({
+            "Raw": raw,
+            "Profession": candidate.where(method == "exact"),
+            "Score": score,
+            "Method": method.where(suggested, "unmatched"),
+            "Candidate": candidate,
+        }, columns=MAP_COLUMNS)
+
+def load_canonical_professions(path=CANONICAL_FILE):
+    return read_excel_cached(path)["Profession"].dropna().astype(str).tolist()
+
+def load_reviewed_aliases(path=ALIASES_FILE):
+    """The reviewed matches as mapping rows, Method "reviewed"."""
+    if not os.path.isfile(path):
+        return pd.DataFrame(columns=MAP_COLUMNS)
+    reviewed = pd.read_csv(path, usecols=["Raw", "Profession"]).dropna().drop_duplicates(subset="Raw")
+    return reviewed.assign(Score=1.0, Method="reviewed", Candidate=reviewed["Profession"])[MAP_COLUMNS]
+
+def build_mapping():
+    """Resolve every raw profession in the profession store, with the reviewed matches of ALIASES_FILE first."""
+    index = ProfessionIndex(load_canonical_professions())
+    raw = load_store(columns=["profession"])["profession"].dropna().astype(str).str.strip()
+
+    reviewed = load_reviewed_aliases()
+    reviewed = reviewed[reviewed["Raw"].isin(raw)]
+    mapping = index.resolve_all(raw[~raw.isin(reviewed["Raw"])])
+    counts = raw.value_counts()
+    mapping = pd.concat([reviewed, mapping], ignore_index=True)
+    mapping["Count"] = mapping["Raw"].map(counts).fillna(0).astype(int)
+    return mapping.sort_values(["Count", "Raw"], ascending=[False, True]).drop(columns="Count")
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    mapping = build_mapping()
+    mapping.to_csv(PROFESSION_MAP_FILE, index=False)
+    print(f"Resolved {len(mapping)} distinct raw professions in {time.perf_counter() - start:.2f}s")
+    print(mapping["Method"].value_counts().to_string())
+    print(f"{mapping['Profession'].isna().sum()} without a Profession; review the token and fuzzy Candidates into {ALIASES_FILE}")
+    print(f"Saved to {PROFESSION_MAP_FILE}")
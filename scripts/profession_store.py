@@ -0,0 +1,180 @@
+"""
+Typed, long-format store for the LLM extraction output.
+
+book_character_professions.csv has no header, keeps ISCO codes and professions as Python-repr
+strings and spreads protagonists over numbered column pairs. This module converts it once into a
+Parquet file with one row per (book, character, profession, ISCO code) and categorical columns,
+so consumers load only the columns they need and never re-parse list strings. Each row keeps the
+position of its book's row in the CSV (row_index) and the book's stable Book ID (book_id, from
+book_dedup), which joins the store with the registry and the validation sets.
+
+    python scripts/profession_store.py   # Convert the legacy CSV
+"""
+import os
+import re
+import csv
+import ast
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+import config
+from book_dedup import book_hashes, format_ids
+
+LEGACY_CSV = os.path.join(config.DATA_DIR, "book_character_professions.csv")
+STORE_FILE = os.path.join(config.DATA_DIR, "book_character_professions.parquet")
+
+BOOK_COLUMNS = ["Book Title", "Book Author", "Genre", "ISCO", "Love Interest", "Love Interest Profession", "Love Interest's ISCO"]
+NO_CHARACTER = ["", "None", "none"]
+
+STORE_COLUMNS = ["row_index", "book_id", "title", "author", "genre", "role", "character_index", "character", "profession_index", "profession", "isco"]
+CATEGORICAL_COLUMNS = ["book_id", "title", "author", "genre", "role", "character", "profession", "isco"]
+
+def parse_list_cell(cell):
+    """
+    Parse a stringified list such as "['Teacher', 'Retiree']" or "[['2330'], ['0']]".
+
+    Returns (values, repaired): hand-edited cells that are not valid Python literals (unbalanced
+    quotes, ISCO codes with leading zeros, trailing text) are parsed leniently and flagged.
+    """
+    cell = cell.strip()
+    if not cell:
+        return [], False
+
+    try:
+        value = ast.literal_eval(cell)
+        if isinstance(value, list):
+            return value, False
+    except (ValueError, SyntaxError):
+        pass
+
+    if not cell.startswith("["):
+        return [cell], True
+
+    def split_items(text):
+        text = re.sub(r"'\s*/\s*'", "/", text)  # e.g. ['Marine biologist'/'Doctor']
+        items = [item.strip().strip("'\"").strip() for item in text.split(",")]
+        return [item for item in items if item]
+
+    inner = cell[1:cell.rfind("]")] if "]" in cell else cell[1:]
+    nested = re.findall(r"\[([^\[\]]*)\]", inner)
+    if nested:
+        return [split_items(group) for group in nested], True
+    return split_items(inner), True
+
+def as_text(value):
+    return None if value is None else str(value)
+
+def read_legacy_rows(path=LEGACY_CSV):
+    """Yield the rows of the legacy CSV as lists, skipping any header rows (the file may or may not have one)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0] == "Book Title":
+                continue
+            yield row
+
+def explode_row(row_index, book_id, row):
+    """
+    Turn one legacy row into long-format records. Returns (records, number of repaired cells).
+
+    Parsing stops at the first profession cell that is not a list: past that point the row holds
+    stray cells (e.g. another book's record glued on by hand editing), which are reported and dropped.
+    """
+    row = row + [""] * (len(BOOK_COLUMNS) - len(row))
+    title, author, genre, isco_cell, love_interest, love_professions_cell, love_isco_cell = row[:len(BOOK_COLUMNS)]
+    repaired = 0
+
+    isco, was_repaired = parse_list_cell(isco_cell)
+    repaired += was_repaired
+
+    characters = []
+    pairs = row[len(BOOK_COLUMNS):]
+    for i in range(0, len(pairs) - 1, 2):
+        name, professions_cell = pairs[i].strip(), pairs[i + 1]
+        if not name:
+            continue
+        if not professions_cell.strip().startswith("["):
+            print(f"Dropping malformed cells from '{title}': {[cell for cell in pairs[i:] if cell]}")
+            break
+        professions, was_repaired = parse_list_cell(professions_cell)
+        repaired += was_repaired
+        codes = isco[len(characters)] if len(characters) < len(isco) else []
+        characters.append(("protagonist", name, professions, codes if isinstance(codes, list) else [codes]))
+
+    if love_interest.strip() not in NO_CHARACTER:
+        professions, was_repaired = parse_list_cell(love_professions_cell)
+        repaired += was_repaired
+        codes, was_repaired = parse_list_cell(love_isco_cell)
+        repaired += was_repaired
+        characters.append(("love_interest", love_interest.strip(), professions, codes))
+
+    records = []
+    protagonist_index = 0
+    for role, name, professions, codes in characters:
+        character_index = protagonist_index if role == "protagonist" else -1
+        protagonist_index += role == "protagonist"
+        for j, profession in enumerate(professions or [None]):
+            records.append({
+                "row_index": row_index,
+                "book_id": book_id,
+                "title": title.strip(),
+                "author": author.strip(),
+                "genre": genre.strip(),
+                "role": role,
+                "character_index": character_index,
+                "character": name,
+                "profession_index": j,
+                "profession": as_text(profession),
+                "isco": as_text(codes[j]) if j < len(codes) else None,
+            })
+    return records, repaired
+
+def to_typed_frame(records):
+    df = pd.DataFrame.from_records(records, columns=STORE_COLUMNS)
+    df["row_index"] = df["row_index"].astype("int32")
+    df["character_index"] = df["character_index"].astype("int16")
+    df["profession_index"] = df["profession_index"].astype("int16")
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype("category")
+    return df
+
+def convert_legacy_csv(csv_file=LEGACY_CSV, store_file=STORE_FILE):
+    """Convert the legacy wide CSV into the long-format Parquet store."""
+    rows = list(read_legacy_rows(csv_file))
+    book_ids = format_ids(book_hashes([row[0] for row in rows], [row[1] if len(row) > 1 else "" for row in rows]))
+    records = []
+    repaired = 0
+    for row_index, (book_id, row) in enumerate(zip(book_ids, rows)):
+        book_records, book_repaired = explode_row(row_index, book_id, row)
+        records.extend(book_records)
+        repaired += book_repaired
+
+    df = to_typed_frame(records)
+    df.to_parquet(store_file, index=False)
+
+    print(f"Converted {df['row_index'].nunique()} books ({df['book_id'].nunique()} distinct Book IDs) into {len(df)} rows ({repaired} malformed cells parsed leniently)")
+    print(f"Saved to {store_file}")
+    return df
+
+def load_store(columns=None, store_file=STORE_FILE):
+    """
+    Load the long-format store, optionally only some columns. Converts the legacy CSV on first use,
+    and again when the CSV is newer or the store has other columns than STORE_COLUMNS.
+    """
+    if (not os.path.isfile(store_file) or os.path.getmtime(store_file) < os.path.getmtime(LEGACY_CSV)
+            or pq.read_schema(store_file).names != STORE_COLUMNS):
+        convert_legacy_csv(store_file=store_file)
+    return pd.read_parquet(store_file, columns=columns)
+
+if __name__ == '__main__':
+    df = convert_legacy_csv()
+
+    start = time.perf_counter()
+    wide = pd.read_csv(LEGACY_CSV, header=None, dtype=str)
+    csv_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    long = load_store()
+    parquet_seconds = time.perf_counter() - start
+
+    print(f"Legacy CSV:    {os.path.getsize(LEGACY_CSV) / 1e6:.2f} MB on disk, {wide.memory_usage(deep=True).sum() / 1e6:.2f} MB in memory, loaded in {csv_seconds * 1000:.1f} ms (lists still unparsed)")
+    print(f"Parquet store: {os.path.getsize(STORE_FILE) / 1e6:.2f} MB on disk, {long.memory_usage(deep=True).sum() / 1e6:.2f} MB in memory, loaded in {parquet_seconds * 1000:.1f} ms")
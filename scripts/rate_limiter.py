@@ -0,0 +1,91 @@
+import asyncio
+import time
+from functools import lru_cache
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a fixed rate per minute."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they already are)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # Never wait for more than a full bucket
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        """Take tokens from the bucket. The balance may go negative, which delays later callers."""
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Limits API calls to a number of requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, estimated_tokens):
+        """Wait until one request and `estimated_tokens` tokens fit within the limits."""
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                if wait == 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(estimated_tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the API reports how many tokens a call really used."""
+        self.tokens.consume(actual_tokens - estimated_tokens)
+
+
+@lru_cache(maxsize=None)
+def tokenizer():
+    """The gpt-4o tokenizer if tiktoken is installed, else None (token counts are then estimated)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # Not installed, or the encoding can't be downloaded
+        return None
+
+def count_tokens(text):
+    """Tokens in `text` with the local tokenizer, or about four characters per token without one."""
+    encoding = tokenizer()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text, max_tokens):
+    """Cut `text` to at most `max_tokens` tokens, at the end of a sentence or word where possible."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = tokenizer()
+    cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) if encoding else text[:max_tokens * 4]
+    for boundary in (". ", " "):
+        end = cut.rfind(boundary)
+        if end > len(cut) // 2:
+            return cut[:end + 1].rstrip()
+    return cut
+
+def estimate_tokens(text, max_completion_tokens=0):
+    """Token count for rate limiting: the prompt's tokens plus the completion tokens reserved."""
+    return count_tokens(text) + max_completion_tokens
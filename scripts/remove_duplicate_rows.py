@@ -1,11 +1,9 @@
 import os
-import pandas as pd
 import config
+from book_dedup import dedup_csvs
 
 FILE_PATH = os.path.join(config.RAW_DATA_DIR, "book_list.csv")
 
-df = pd.read_csv(FILE_PATH, dtype=str)
-df_cleaned = df.drop_duplicates(subset=["Title", "Author"], keep="first")
-df_cleaned.to_csv(FILE_PATH, index=False)
+rows, books = dedup_csvs([FILE_PATH], FILE_PATH)
 
-print(f"Cleaned file saved. {len(df_cleaned)} unique books remain.")
+print(f"Cleaned file saved. {books} unique books remain ({rows - books} duplicates removed).")
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+MISSING = object()
+ENTRY_DIR = "responses"  # Subdirectory of cache_dir holding the entries; cache_dir may hold other files
+ENTRY_EXTENSION = ".json"
+
+
+class CacheMiss(KeyError):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache for API responses, keyed on a hash of (endpoint, params). The
+    endpoint is the URL requested, base URL included, so answers from a local stand-in server
+    are never replayed as real ones.
+
+    Each response is stored as a JSON file named after its key, under ENTRY_DIR. Entries fetched more
+    than `max_age_days` ago are ignored and evicted, however often they are read, and the least
+    recently used entries are evicted once the cache grows beyond `max_size_mb`. A file's mtime is
+    when it was fetched and its atime when it was last used. In replay mode the cache is read-only and a miss raises CacheMiss, so a
+    run can be reproduced offline without touching the network.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=None, max_age_days=None, replay=False):
+        self.cache_dir = cache_dir
+        self.entry_dir = os.path.join(cache_dir, ENTRY_DIR)
+        self.max_size = max_size_mb * 1024 * 1024 if max_size_mb else None
+        self.max_age = max_age_days * 24 * 3600 if max_age_days else None
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.entry_dir, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint, params):
+        payload = json.dumps({"endpoint": endpoint, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.entry_dir, key[:2], f"{key}{ENTRY_EXTENSION}")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, endpoint, params):
+        """Return the cached response, or MISSING (CacheMiss in replay mode)."""
+        path = self._path(self.key(endpoint, params))
+        try:
+            fetched = os.path.getmtime(path)
+            if self.max_age and not self.replay and time.time() - fetched > self.max_age:
+                raise FileNotFoundError(path)
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path, (time.time(), fetched))  # Mark as recently used for eviction, keeping the fetch time
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count(hit=False)
+            if self.replay:
+                raise CacheMiss(f"No cached response for {endpoint} {params}")
+            return MISSING
+
+        self._count(hit=True)
+        return value
+
+    def set(self, endpoint, params, value):
+        """Store a response. Does nothing in replay mode."""
+        if self.replay:
+            return
+        path = self._path(self.key(endpoint, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """
+        Remove expired entries, then the least recently used ones until the cache fits max_size.
+        Only entry files are considered, not the other files kept in cache_dir.
+        """
+        if self.replay:
+            return 0
+
+        entries = []
+        for root, _, files in os.walk(self.entry_dir):
+            for name in files:
+                if not name.endswith(ENTRY_EXTENSION):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_atime, stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        removed = 0
+        total_size = sum(size for _, _, size, _ in entries)
+        for _, fetched, size, path in sorted(entries):
+            expired = self.max_age and now - fetched > self.max_age
+            oversized = self.max_size and total_size > self.max_size
+            if not (expired or oversized):
+                continue
+            os.remove(path)
+            total_size -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate)"
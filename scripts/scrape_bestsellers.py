@@ -1,84 +1,120 @@
 import os
+import json
+import requests
+import lxml.html
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
 import pandas as pd
-import time
-import config 
+import config
 
 # User credentials for Publishers Marketplace
 USERNAME = 0 # Replace with actual username
 PASSWORD = 0 # Replace with actual password
 
+BASE_URL = os.environ.get("PUBLISHERS_MARKETPLACE_URL", "https://www.publishersmarketplace.com")  # Or a local mock
+
 publisher_dict = {
                    "NYT": {"HCF", "PBF", "COF"},
                    "AMZ": {"COF"},
                    "BKS": {"PBF", "HCF"},
-                   "PBW": {"HCF"}                
+                   "PBW": {"HCF"}
                 }
 
 YEAR = 2024
 
+NUM_WORKERS = 4  # Lists scraped in parallel
+INCREMENTAL = False  # Only scrape weeks newer than the last run, and add them to the existing CSVs
+STATE_FILE = os.path.join(config.RAW_DATA_DIR, "bestsellers_state.json")  # Last scraped week per list
+
 MONTH_MAP = {
     "January": "01", "February": "02", "March": "03", "April": "04",
     "May": "05", "June": "06", "July": "07", "August": "08",
     "September": "09", "October": "10", "November": "11", "December": "12"
 }
 
-def scrape_books(YEAR, publisher="NYT", list_type="HCF"):
+def login():
+    """Log in once with a browser and return the authenticated session cookies."""
     options = webdriver.ChromeOptions()
-    options.add_argument("--no-sandbox")  
+    options.add_argument("--no-sandbox")
     options.add_argument("--disable-notifications")  # Disables push notifications
     options.add_argument("--disable-popup-blocking")  # Prevents popups
-    options.add_argument("--disable-sync")  
+    options.add_argument("--disable-sync")
     options.add_argument("--headless")
-    
+
     driver = webdriver.Chrome(options=options)
-    
-    driver.get("https://www.publishersmarketplace.com/login.php/")
-    time.sleep(2)
-    
-    # Enter login credentials
-    driver.find_element(By.ID, "username").send_keys(USERNAME)
-    driver.find_element(By.ID, "pass").send_keys(PASSWORD)
-    
-    driver.find_element(By.XPATH, "//input[@value='Log in']").click()
-    time.sleep(3)  
-    
+    try:
+        driver.get(f"{BASE_URL}/login.php/")
+        wait = WebDriverWait(driver, 10)
+
+        # Enter login credentials
+        wait.until(EC.presence_of_element_located((By.ID, "username"))).send_keys(USERNAME)
+        driver.find_element(By.ID, "pass").send_keys(PASSWORD)
+
+        driver.find_element(By.XPATH, "//input[@value='Log in']").click()
+        wait.until(EC.staleness_of(driver.find_element(By.ID, "username")))
+
+        return driver.get_cookies()
+    finally:
+        driver.quit()
+
+def create_session(cookies):
+    """A requests session carrying the cookies of the browser login."""
+    session = requests.Session()
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+    return session
+
+def parse_list_page(page_html):
+    """Return the (title, author) pairs on a list page and the date of the next list ("" if none)."""
+    root = lxml.html.fromstring(page_html)
+
     books = []
-    month = "01"
-    day = "01"
+    for book in root.xpath("//td/b"):
+        title = book.text_content().strip()
+        full_text = book.getparent().text_content().strip()
+
+        if ", by " in full_text:
+            author = full_text.split(", by ")[-1].split(" (")[0].strip()
+        else:
+            author = "Unknown"
+
+        if title.lower() in ["previous list", "next list", "current list"]:  # Remove navigation texts
+            continue
+        if title.isdigit():  # Remove numbers-only entries
+            continue
+        if author == "Unknown":  # Ignore short non-book titles
+            continue
+
+        books.append((title, author))
+
+    # Find **the last available next list date**
+    next_list_elements = root.xpath("//span[@style='color:#009;']")
+    next_date = next_list_elements[-1].text_content().strip() if next_list_elements else ""
+
+    return books, next_date
+
+def scrape_books(session, year, publisher="NYT", list_type="HCF", start=("01", "01")):
+    """Walk the weekly lists of one publisher/list type from `start` (month, day) to the end of `year`.
+
+    Returns the books as a DataFrame and the (month, day) of the last list scraped.
+    """
+    books = []
+    month, day = start
+    last_scraped = None
 
     while True:
         try:
-            driver.get(f"https://www.publishersmarketplace.com/bestsellers/list.cgi?src={publisher}&lst={list_type}&pubmonth={month}&pubday={day}&pubYEAR={YEAR}")
-            time.sleep(2)  
-
-            # Find book elements in the current list
-            book_elements = driver.find_elements(By.XPATH, "//td/b")
-
-            for book in book_elements:
-                title = book.text.strip()
-                full_text = book.find_element(By.XPATH, "./..").text.strip()
-
-                if ", by " in full_text:
-                    author = full_text.split(", by ")[-1].split(" (")[0].strip()
-                else:
-                    author = "Unknown"
-                
-                if title.lower() in ["previous list", "next list", "current list"]:  # Remove navigation texts
-                    continue
-                if title.isdigit():  # Remove numbers-only entries
-                    continue
-                if author == "Unknown":  # Ignore short non-book titles
-                    continue
-
-                books.append((title, author))
-
-            # Find **the last available next list date**
-            next_list_elements = driver.find_elements(By.XPATH, "//span[@style='color:#009;']")
-            next_list_element = next_list_elements[-1]  # Select the last date
-            next_date = next_list_element.text.strip()
+            response = session.get(f"{BASE_URL}/bestsellers/list.cgi",
+                                   params={"src": publisher, "lst": list_type, "pubmonth": month, "pubday": day, "pubYEAR": year},
+                                   timeout=30)
+            response.raise_for_status()
+
+            page_books, next_date = parse_list_page(response.content)
+            books.extend(page_books)
+            last_scraped = (month, day)
 
             # Extract month, day, and year from next_date
             month_name, day, next_year = next_date.split()
@@ -86,27 +122,64 @@ def scrape_books(YEAR, publisher="NYT", list_type="HCF"):
             day = day.strip(",")
 
             # Stop at the end of the selected year
-            if int(next_year) > YEAR:
-                print(f"Reached the end of {YEAR}, stopping scrape.")
+            if int(next_year) > year:
+                print(f"Reached the end of {year} for {publisher} {list_type}, stopping scrape.")
+                break
+
+            # The newest list has no next list to link to
+            if (int(month), int(day)) <= tuple(map(int, last_scraped)):
+                print(f"Reached the newest {publisher} {list_type} list, stopping scrape.")
                 break
 
         except Exception as e:
-            print("No more lists available or an error occurred:", e)
+            print(f"No more {publisher} {list_type} lists available or an error occurred:", e)
             break
 
-    
-    driver.quit()
-    
     df = pd.DataFrame(books, columns=["Title", "Author"]).drop_duplicates()
-    return df
+    return df, last_scraped
 
-if __name__ == '__main__':
-    for publisher, list_type in publisher_dict.items():
-        for bestseller_list in list_type:
-            df_books = scrape_books(year=YEAR, publisher=publisher, list_type=bestseller_list)
-            df_books.to_csv(os.path.join(config.RAW_DATA_DIR, f"{publisher}_{bestseller_list}_bestsellers_{YEAR}.csv"), index=False)
+def output_file(publisher, list_type, year):
+    return os.path.join(config.RAW_DATA_DIR, f"{publisher}_{list_type}_bestsellers_{year}.csv")
 
+def load_state():
+    if os.path.isfile(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
 
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
 
+def scrape_list(cookies, year, publisher, list_type, state):
+    """Worker: scrape one list with its own session and write it to CSV. Returns the state key and last week."""
+    key = f"{publisher}_{list_type}_{year}"
+    start = tuple(state[key]) if INCREMENTAL and key in state else ("01", "01")
 
+    df_books, last_scraped = scrape_books(create_session(cookies), year, publisher, list_type, start=start)
 
+    path = output_file(publisher, list_type, year)
+    if INCREMENTAL and os.path.isfile(path):
+        df_books = pd.concat([pd.read_csv(path), df_books], ignore_index=True).drop_duplicates()
+    df_books.to_csv(path, index=False)
+
+    print(f"Saved {len(df_books)} books to {path}")
+    return key, last_scraped
+
+def scrape_all_lists(year):
+    cookies = login()
+    state = load_state()
+    os.makedirs(config.RAW_DATA_DIR, exist_ok=True)
+
+    jobs = [(publisher, bestseller_list) for publisher, list_type in publisher_dict.items() for bestseller_list in list_type]
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        results = executor.map(lambda job: scrape_list(cookies, year, *job, state), jobs)
+        for key, last_scraped in results:
+            if last_scraped is not None:
+                state[key] = last_scraped
+
+    save_state(state)
+
+if __name__ == '__main__':
+    scrape_all_lists(YEAR)
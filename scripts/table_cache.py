@@ -0,0 +1,111 @@
+"""
+Shared data access for the xlsx tables: each workbook is parsed with openpyxl once and cached as
+Parquet. Later loads read the Parquet copy as long as the workbook is unchanged.
+
+A cached copy is used when the workbook's size and modification time match the ones recorded at
+caching time. If only the modification time changed (e.g. after a git checkout), the content
+hash is compared before reparsing.
+
+    python scripts/table_cache.py   # Timing report: xlsx vs cached load for each plot script
+"""
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+import config
+
+# Workbooks read by each plot script
+PLOT_INPUTS = {
+    "plot_prestige.py": ["profession_ranking_realistic_genres.xlsx"],
+    "plot_profession_prevalence.py": ["profession_ranking_all_genres.xlsx"],
+    "plot_profession_prevalence_by_genre.py": ["profession_ranking_all_genres.xlsx"],
+    "plot_profession_prevalence_vs_reality.py": ["profession_ranking_realistic_genres.xlsx"],
+    "plot_romance_male_female.py": ["genres/romance.xlsx", "genres/fantasy_romance.xlsx"],
+}
+
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def cache_paths(path, read_kwargs):
+    """Cache file and metadata file for a workbook read with the given read_excel arguments."""
+    key = hashlib.sha256(json.dumps([os.path.abspath(path), read_kwargs], sort_keys=True, default=str).encode()).hexdigest()[:16]
+    name = f"{os.path.splitext(os.path.basename(path))[0]}_{key}"
+    return os.path.join(config.TABLE_CACHE_DIR, f"{name}.parquet"), os.path.join(config.TABLE_CACHE_DIR, f"{name}.json")
+
+def load_cached(path, cache_file, meta_file):
+    """Return the cached table if it is still valid for the workbook, else None."""
+    if not (os.path.isfile(cache_file) and os.path.isfile(meta_file)):
+        return None
+    with open(meta_file) as f:
+        meta = json.load(f)
+
+    stat = os.stat(path)
+    if (stat.st_size, stat.st_mtime_ns) != (meta["size"], meta["mtime_ns"]):
+        if stat.st_size != meta["size"] or file_hash(path) != meta["sha256"]:
+            return None
+        # Same content with a new timestamp: remember it so the hash isn't recomputed next time
+        meta["mtime_ns"] = stat.st_mtime_ns
+        with open(meta_file, "w") as f:
+            json.dump(meta, f)
+
+    df = pd.read_parquet(cache_file)
+    if meta["integer_columns"]:
+        df.columns = [int(column) for column in df.columns]
+    return df
+
+def save_cached(df, path, cache_file, meta_file):
+    os.makedirs(config.TABLE_CACHE_DIR, exist_ok=True)
+    integer_columns = all(isinstance(column, int) for column in df.columns)  # e.g. read with header=None
+    try:
+        df.set_axis([str(column) for column in df.columns], axis=1).to_parquet(cache_file, index=False)
+    except (ValueError, TypeError, ImportError) as e:
+        # Columns mixing numbers and text can't be stored as Arrow; keep using the workbook
+        print(f"Not caching {os.path.basename(path)}: {e}")
+        return
+
+    stat = os.stat(path)
+    meta = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_hash(path), "integer_columns": integer_columns}
+    with open(meta_file, "w") as f:
+        json.dump(meta, f)
+
+# Tables held in memory by preload(), keyed by cache file
+_preloaded = {}
+
+def read_excel_cached(path, **read_kwargs):
+    """Drop-in replacement for pd.read_excel that reuses a Parquet copy of unchanged workbooks."""
+    cache_file, meta_file = cache_paths(path, read_kwargs)
+    if cache_file in _preloaded:
+        return _preloaded[cache_file].copy()
+
+    df = load_cached(path, cache_file, meta_file)
+    if df is None:
+        df = pd.read_excel(path, **read_kwargs)
+        save_cached(df, path, cache_file, meta_file)
+    return df
+
+def preload(path, **read_kwargs):
+    """Keep a table in memory so that every later read_excel_cached call in this process (or in
+    processes forked from it) gets a copy instead of reading the file again."""
+    cache_file, _ = cache_paths(path, read_kwargs)
+    _preloaded[cache_file] = read_excel_cached(path, **read_kwargs)
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+if __name__ == '__main__':
+    pd.read_excel(os.path.join(config.DATA_DIR, PLOT_INPUTS["plot_prestige.py"][0]))  # Warm up imports before timing
+    print(f"{'Script':42} {'xlsx (ms)':>10} {'cached (ms)':>12} {'speedup':>8}")
+    for script, workbooks in PLOT_INPUTS.items():
+        paths = [os.path.join(config.DATA_DIR, workbook) for workbook in workbooks]
+        before = sum(time_call(pd.read_excel, path) for path in paths)
+        for path in paths:
+            read_excel_cached(path)  # Make sure the cache is warm
+        after = sum(time_call(read_excel_cached, path) for path in paths)
+        print(f"{script:42} {before:10.1f} {after:12.1f} {before / after:7.1f}x")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "scripts")]
+
+# fetch_book_data creates its OpenAI clients at import; no request is sent in the tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,107 @@
+import os
+import shutil
+import pytest
+import config
+from book_registry import BookRegistry
+from profession_store import read_legacy_rows
+from fetch_book_data import OUTPUT_COLUMNS, OutputWriter, load_existing_books, print_plan_report, repair_output_file, unpack_answers
+
+SHIPPED_CSV = os.path.join(config.DATA_DIR, "book_character_professions.csv")
+
+@pytest.fixture
+def output_copy(tmp_path):
+    path = tmp_path / "book_character_professions.csv"
+    shutil.copy(SHIPPED_CSV, path)
+    return path
+
+def test_repair_keeps_complete_last_row(output_copy):
+    before = output_copy.read_bytes()
+    repair_output_file(str(output_copy))
+    after = output_copy.read_bytes()
+    assert after == before + b"\n"
+    assert after.splitlines()[-1].startswith(b"Zero Days,Ruth Ware,")
+
+def test_repair_drops_partial_last_row(output_copy):
+    complete = output_copy.read_bytes() + b"\n"
+    output_copy.write_bytes(complete + b'Some Book,Some Author,Thriller,"[[\'2')
+    repair_output_file(str(output_copy))
+    assert output_copy.read_bytes() == complete
+
+def test_load_existing_books_reads_headerless_output(output_copy, tmp_path):
+    with BookRegistry(str(tmp_path / "registry.sqlite")) as registry:
+        protagonist_columns = load_existing_books(str(output_copy), registry)
+        books = list(read_legacy_rows(str(output_copy)))
+
+        assert protagonist_columns == (len(books[0]) - len(OUTPUT_COLUMNS)) // 2
+        expected = set(registry.register([row[0] for row in books], [row[1] for row in books]))
+        assert registry.completed("extraction") == expected
+        assert not registry.pending_among("extraction", expected)
+
+def test_saved_rows_line_up_with_the_output_columns(output_copy, tmp_path):
+    with BookRegistry(str(tmp_path / "registry.sqlite")) as registry:
+        writer = OutputWriter(str(output_copy), load_existing_books(str(output_copy), registry), registry)
+        book_data = {"Protagonists": ["Jane Doe"], "Professions": [["Detective"]], "ISCO": [["3355"]],
+                     "Genre": "Thriller", "Book Author": "Some Author", "Book Title": "Some Book",
+                     "Love Interest": "None", "Love Interest Profession": ["None"], "Love Interest's ISCO": ["0"],
+                     "Confidence": 0.9}
+        writer.save(book_data, {"Title": "Some Book", "Author": "Some Author", "Book ID": "some-id"})
+
+    last = list(read_legacy_rows(str(output_copy)))[-1]
+    assert last[:4] == ["Some Book", "Some Author", "Thriller", "[['3355']]"]
+    assert last[len(OUTPUT_COLUMNS):len(OUTPUT_COLUMNS) + 2] == ["Jane Doe", "['Detective']"]
+    assert len(last) == len(list(read_legacy_rows(SHIPPED_CSV))[0])
+
+def test_registry_follows_the_output_file(output_copy, tmp_path):
+    with BookRegistry(str(tmp_path / "registry.sqlite")) as registry:
+        load_existing_books(str(output_copy), registry)
+        orphan = registry.register(["Not In The File"], ["Nobody"])[0]
+        registry.complete("extraction", [orphan])
+
+        rows = output_copy.read_bytes().splitlines(keepends=True)
+        output_copy.write_bytes(b"".join(rows[:-1]))  # Last row removed by hand
+        written = b'Written Before A Crash,Some Author,Thriller,"[[\'2\']]"\n'
+        output_copy.write_bytes(output_copy.read_bytes() + written)
+
+        load_existing_books(str(output_copy), registry)
+        removed, crashed = registry.register(["Zero Days", "Written Before A Crash"], ["Ruth Ware", "Some Author"])
+        pending = registry.pending_among("extraction", [removed, crashed, orphan])
+        assert pending == {removed, orphan}
+
+def test_plan_report_counts_escalated_calls(capsys):
+    usages = [
+        {"plan": "grounded", "calls": 1, "tiers": [{"model": "small", "calls": 1}]},
+        {"plan": "direct+search", "calls": 4, "search_calls": 2,
+         "tiers": [{"model": "small", "calls": 3}, {"model": "large", "calls": 3}]},
+    ]
+    print_plan_report(usages)
+    report = capsys.readouterr().out
+    assert "7 calls for 2 books (3.50 per book, 3 of them after an escalation) instead of 6: -1 saved" in report
+
+def answer_for(title, author, **fields):
+    return {"Book Title": title, "Book Author": author, "Genre": "Thriller", "Protagonists": ["Jane Doe"],
+            "Professions": [["Detective"]], "ISCO": [["3355"]], "Love Interest": "None",
+            "Love Interest Profession": ["None"], "Love Interest's ISCO": ["0"], "Confidence": 0.9, **fields}
+
+def test_unpack_answers_keeps_duplicate_titles_apart():
+    books = [{"Title": "Home", "Author": "Harlan Coben"}, {"Title": "Home", "Author": "Toni Morrison"}]
+    numbered = [answer_for("Home", "Toni Morrison", **{"Book Number": 2}), answer_for("Home", "Harlan Coben", **{"Book Number": 1})]
+    assert [answer["Book Author"] for answer in unpack_answers(books, numbered)] == ["Harlan Coben", "Toni Morrison"]
+    unnumbered = [answer_for("Home", "Toni Morrison"), answer_for("Home", "Harlan Coben")]
+    assert [answer["Book Author"] for answer in unpack_answers(books, unnumbered)] == ["Harlan Coben", "Toni Morrison"]
+
+def test_unpack_answers_leaves_ambiguous_answers_unmatched():
+    books = [{"Title": "Home", "Author": "Harlan Coben"}, {"Title": "Home", "Author": "Harlan Coben"}]
+    assert unpack_answers(books, [answer_for("Home", "Harlan Coben")]) == [None, None]
+
+def test_saved_books_stay_completed_whatever_the_model_echoed(output_copy, tmp_path):
+    with BookRegistry(str(tmp_path / "registry.sqlite")) as registry:
+        writer = OutputWriter(str(output_copy), load_existing_books(str(output_copy), registry), registry)
+        book_id = registry.register(["Some Book"], ["Ann Smith and Bob Jones"])[0]
+        book_data = {"Protagonists": ["Jane Doe"], "Professions": [["Detective"]], "ISCO": [["3355"]],
+                     "Genre": "Thriller", "Book Title": "Some Book: A Novel", "Book Author": "Bob Jones",
+                     "Love Interest": "None", "Love Interest Profession": ["None"], "Love Interest's ISCO": ["0"]}
+        writer.save(book_data, {"Title": "Some Book", "Author": "Ann Smith and Bob Jones", "Book ID": book_id})
+
+        load_existing_books(str(output_copy), registry)
+        assert book_id in registry.completed("extraction")
+        assert not registry.pending_among("extraction", [book_id])
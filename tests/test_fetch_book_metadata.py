@@ -0,0 +1,20 @@
+import fetch_book_metadata
+from book_registry import BookRegistry
+
+def test_failed_requests_stay_pending(tmp_path, monkeypatch):
+    def fake_fetch(title, author):
+        if title == "Throttled":
+            return None
+        return {"Title": title, "Author": author, "Genres": "Fiction", "Description": "A book."}
+
+    monkeypatch.setattr(fetch_book_metadata, "fetch_google_books_metadata", fake_fetch)
+    registry = BookRegistry(str(tmp_path / "registry.sqlite"))
+    books = [("Fetched", "A. Writer"), ("Throttled", "B. Writer")]
+
+    metadata = fetch_book_metadata.fetch_all_metadata(books, {}, registry)
+
+    assert [row.get("Genres") for row in metadata] == ["Fiction", None]
+    fetched_id, throttled_id = registry.register(["Fetched", "Throttled"], ["A. Writer", "B. Writer"])
+    assert registry.completed("metadata") == {fetched_id}
+    assert throttled_id in registry.pending("metadata")
+    registry.close()
@@ -0,0 +1,15 @@
+import config
+import make_figures
+
+def test_figure_hash_follows_imported_helpers(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRIPTS_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "REPO_ROOT", str(tmp_path))
+    monkeypatch.setattr(make_figures, "PLOT_INPUTS", {"plot_demo.py": []})
+    monkeypatch.setattr(make_figures, "CODE_FILES", [])
+    (tmp_path / "plot_demo.py").write_text("import os\nfrom helper import load\n")
+    (tmp_path / "helper.py").write_text("from store import rows\n")
+    (tmp_path / "store.py").write_text("rows = []\n")
+
+    before = make_figures.figure_hash("plot_demo.py")
+    (tmp_path / "store.py").write_text("rows = [1]\n")
+    assert make_figures.figure_hash("plot_demo.py") != before
@@ -0,0 +1,24 @@
+import pytest
+from profession_index import ProfessionIndex, load_canonical_professions, normalize_label, MIN_SCORE
+
+@pytest.fixture(scope="module")
+def index():
+    return ProfessionIndex(load_canonical_professions())
+
+@pytest.mark.parametrize("raw", [
+    "FBI Special Agent", "Civil Servant", "Retired Soccer Star", "Academic Rival", "Shop Owner",
+])
+def test_no_match_on_a_shared_word_alone(index, raw):
+    profession, score, method = index.resolve(normalize_label(raw))
+    assert score < MIN_SCORE, (raw, profession, score)
+
+@pytest.mark.parametrize("raw, expected", [
+    ("English Teacher", "Teacher"),
+    ("Retired Nurse", "Nurse"),
+    ("Private Detective", "Detective"),
+    ("Editor", "Editor"),  # Not the editor of "Film/TV (producer/editor/director/maker)"
+    ("Book Editor", "Editor"),
+])
+def test_head_noun_matches(index, raw, expected):
+    profession, score, _ = index.resolve(normalize_label(raw))
+    assert (profession, score >= MIN_SCORE) == (expected, True)
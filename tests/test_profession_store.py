@@ -0,0 +1,13 @@
+from book_dedup import book_id
+from profession_store import convert_legacy_csv
+
+def test_store_keeps_row_position_and_stable_book_id(tmp_path):
+    csv_file = tmp_path / "legacy.csv"
+    csv_file.write_text(
+        "Dune,Frank Herbert,Science fiction,\"[['0']]\",None,[],[],Paul Atreides,\"['Duke']\"\n"
+        "Home,Toni Morrison,Literary fiction,\"[['5414']]\",None,[],[],Frank Money,\"['Soldier']\"\n"
+    )
+    df = convert_legacy_csv(str(csv_file), str(tmp_path / "store.parquet"))
+
+    assert df["row_index"].tolist() == [0, 1]
+    assert df["book_id"].astype(str).tolist() == [book_id("Dune", "Frank Herbert"), book_id("Home", "Toni Morrison")]
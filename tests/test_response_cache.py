@@ -0,0 +1,47 @@
+import os
+import time
+from response_cache import ResponseCache, MISSING
+
+def test_answers_are_kept_apart_per_base_url(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    params = {"q": "Dune by Frank Herbert"}
+    cache.set("http://127.0.0.1:8765/customsearch/v1", params, {"items": ["mock"]})
+
+    assert cache.get("https://www.googleapis.com/customsearch/v1", params) is MISSING
+    assert cache.get("http://127.0.0.1:8765/customsearch/v1", params) == {"items": ["mock"]}
+
+def test_evict_only_removes_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_mb=1e-6, max_age_days=1)
+    cache.set("https://example.com/api", {"n": 1}, "x" * 100)
+    log = tmp_path / "token_log.jsonl"
+    log.write_text("{}\n")
+    old = time.time() - 10 * 24 * 3600
+    os.utime(log, (old, old))
+
+    assert cache.evict() == 1
+    assert cache.get("https://example.com/api", {"n": 1}) is MISSING
+    assert log.exists()
+
+def test_entries_expire_by_fetch_time_however_often_read(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age_days=1)
+    cache.set("https://example.com/api", {"n": 1}, "fresh")
+    path = cache._path(cache.key("https://example.com/api", {"n": 1}))
+    fetched = time.time() - 0.5 * 24 * 3600
+    os.utime(path, (fetched, fetched))
+
+    assert cache.get("https://example.com/api", {"n": 1}) == "fresh"
+    assert os.path.getmtime(path) == fetched
+    os.utime(path, (time.time(), time.time() - 2 * 24 * 3600))
+    assert cache.get("https://example.com/api", {"n": 1}) is MISSING
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_mb=150 / 1024 / 1024)
+    for n in (1, 2):
+        cache.set("https://example.com/api", {"n": n}, "x" * 100)
+    now = time.time()
+    os.utime(cache._path(cache.key("https://example.com/api", {"n": 1})), (now, now - 100))
+    os.utime(cache._path(cache.key("https://example.com/api", {"n": 2})), (now - 50, now))
+
+    assert cache.evict() == 1
+    assert cache.get("https://example.com/api", {"n": 1}) == "x" * 100
+    assert cache.get("https://example.com/api", {"n": 2}) is MISSING